@@ -1,35 +1,8 @@
 import streamlit as st
-import sqlalchemy
 import pandas as pd
 import plotly.express as px
 from assets.subject_data import subject_overall_dict
-
-
-@st.cache_resource
-def connect_db():
-    return sqlalchemy.create_engine(st.secrets["DB_URL"])
-
-
-@st.cache_data
-def load():
-    engine = connect_db()
-
-    with engine.begin() as conn:
-        return pd.read_sql_table("papers_scopus", conn)
-
-
-df = load()
-
-
-@st.cache_data
-def load_scraped():
-    engine = connect_db()
-
-    with engine.begin() as conn:
-        return pd.read_sql_table("papers_arxiv", conn)
-
-
-df_scraped = load_scraped()
+from data import SCOPUS, ARXIV, ALL_FIELDS, SOURCES, load_cubes
 
 
 # Sticky note styling
@@ -66,9 +39,6 @@ st.html(
 )
 
 
-# st.write(df["subject_codes"].map(lambda x :str(x)[1:3]))
-df["two_digits"] = df["subject_codes"].map(lambda x: str(x)[1:3])
-# st.write(df['subject_names'].map(set).explode().value_counts())
 st.title("Honggege Data Science Project")
 # st.header("Organize your app with layouts")
 
@@ -97,19 +67,12 @@ st.header("Data Overview")
 
 col1, col2 = st.columns([1, 1])
 
-total_paper = 0
-num_authors = 0
-num_countries = 0
-
-df = df[(df["bib_pub_year"] >= start) & (df["bib_pub_year"] <= end)]
-df_scraped = df_scraped[(df_scraped["year"] >= start) & (df_scraped["year"] <= end)]
-
-total_paper = df.shape[0]
-num_authors = df["authors"].explode().nunique()
-num_countries = df["affiliation_country"].nunique()
-df_author = df
-
-total_scraped_paper = df_scraped.shape[0]
+# Only the counts are shown: read from the count cube, not paper rows
+totals = load_cubes()["papers"].count_by(
+    "source", year=range(start, end + 1), field=list(ALL_FIELDS.values())
+)
+total_paper = int(totals.get(SOURCES[SCOPUS], 0))
+total_scraped_paper = int(totals.get(SOURCES[ARXIV], 0))
 
 # Number of Papers
 
@@ -0,0 +1,90 @@
+from pathlib import Path
+import numpy as np
+
+
+def spherical_kmeans(vectors, n_lists, iterations=10, sample_size=100_000, seed=0):
+    # k-means on the unit sphere (centroids re-normalized every step), which is
+    # the right clustering for inner-product search over normalized vectors.
+    rng = np.random.default_rng(seed)
+    if len(vectors) > sample_size:
+        sample = vectors[rng.choice(len(vectors), sample_size, replace=False)]
+    else:
+        sample = vectors
+
+    centroids = sample[rng.choice(len(sample), n_lists, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, sample)
+        empty = ~sums.any(axis=1)
+        # Re-seed empty lists from random points so every list stays usable
+        sums[empty] = sample[rng.choice(len(sample), empty.sum(), replace=False)]
+        centroids = sums / np.linalg.norm(sums, axis=1, keepdims=True)
+
+    return centroids.astype(np.float32)
+
+
+class IVFIndex:
+    # Inverted-file index: rows are bucketed by their nearest centroid and a
+    # query only visits the `nprobe` closest buckets. Buckets are stored CSR
+    # style, `rows[offsets[i]:offsets[i + 1]]` being the store rows of list i.
+    def __init__(self, centroids, offsets, rows):
+        self.centroids = centroids
+        self.offsets = offsets
+        self.rows = rows
+
+    @classmethod
+    def build(cls, vectors, rows=None, n_lists=None, block_size=65_536, **kwargs):
+        if rows is None:
+            rows = np.arange(len(vectors))
+        if n_lists is None:
+            n_lists = max(1, int(4 * np.sqrt(len(rows))))
+
+        data = vectors[rows]
+        centroids = spherical_kmeans(data, min(n_lists, len(rows)), **kwargs)
+
+        assignment = np.empty(len(rows), dtype=np.int32)
+        for start in range(0, len(rows), block_size):
+            block = data[start : start + block_size]
+            assignment[start : start + block_size] = np.argmax(
+                block @ centroids.T, axis=1
+            )
+
+        order = np.argsort(assignment, kind="stable")
+        offsets = np.zeros(len(centroids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assignment, minlength=len(centroids)), out=offsets[1:])
+        return cls(centroids, offsets, rows[order].astype(np.int32))
+
+    @classmethod
+    def load(cls, directory, field, mmap_mode=None):
+        directory = Path(directory)
+        return cls(
+            *(
+                np.asarray(
+                    np.load(directory / f"ivf.{field}.{name}.npy", mmap_mode=mmap_mode)
+                )
+                for name in ("centroids", "offsets", "rows")
+            )
+        )
+
+    @staticmethod
+    def exists(directory, field):
+        return (Path(directory) / f"ivf.{field}.rows.npy").exists()
+
+    def save(self, directory, field):
+        directory = Path(directory)
+        np.save(directory / f"ivf.{field}.centroids.npy", self.centroids)
+        np.save(directory / f"ivf.{field}.offsets.npy", self.offsets)
+        np.save(directory / f"ivf.{field}.rows.npy", self.rows)
+
+    @property
+    def n_lists(self):
+        return len(self.centroids)
+
+    def candidates(self, query_vector, nprobe):
+        query = np.asarray(query_vector, dtype=np.float32).ravel()
+        nprobe = min(nprobe, self.n_lists)
+        probe = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+        return np.concatenate(
+            [self.rows[self.offsets[i] : self.offsets[i + 1]] for i in probe]
+        )
@@ -0,0 +1,133 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+import requests
+
+# Files published with a release and listed in its manifest.json
+ARTIFACT_PATTERNS = [
+    "vectors.*.npy",
+    "ivf.*.npy",
+    "filter.*.npy",
+    "filters.json",
+    "bm25.*",
+    "similar.*.npy",
+    "quantized.*.npy",
+    "pca*.npy",
+]
+DEFAULT_ROOT = Path.home() / ".cache" / "papers-search"
+# A partial download of another release younger than this may still be in
+# progress in another process, and is not pruned
+PRUNE_PARTIAL_AFTER = 60 * 60
+
+
+def file_sha256(path):
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def write_manifest(directory, version=None):
+    directory = Path(directory)
+    files = sorted(
+        {path for pattern in ARTIFACT_PATTERNS for path in directory.glob(pattern)}
+    )
+    manifest = {
+        "version": version or time.strftime("%Y%m%d%H%M%S"),
+        "files": {
+            path.name: {"sha256": file_sha256(path), "size": path.stat().st_size}
+            for path in files
+        },
+    }
+    with open(directory / "manifest.json", "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+class ArtifactCache:
+    # Local copy of the release artifacts in <root>/<version>/. A file is only
+    # moved into place after its size and sha256 match the manifest, so any
+    # file present there is valid and can be memory mapped as is. Processes on
+    # the same host share the directory (and the OS page cache for it).
+    def __init__(self, base_url, root=DEFAULT_ROOT):
+        self.base_url = base_url
+        self.root = Path(root)
+        self._manifest = None
+
+    @property
+    def manifest(self):
+        if self._manifest is None:
+            try:
+                response = requests.get(self.base_url + "manifest.json", timeout=30)
+                response.raise_for_status()
+                self._manifest = response.json()
+            except requests.RequestException:
+                # Offline restart: fall back to the newest complete local copy
+                local = sorted(
+                    self.root.glob("*/manifest.json"), key=lambda p: p.stat().st_mtime
+                )
+                if not local:
+                    raise
+                with open(local[-1]) as f:
+                    self._manifest = json.load(f)
+        return self._manifest
+
+    @property
+    def directory(self):
+        return self.root / self.manifest["version"]
+
+    def path(self, name):
+        entry = self.manifest["files"][name]
+        path = self.directory / name
+        if path.exists() and path.stat().st_size == entry["size"]:
+            return path
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{name}.{os.getpid()}.tmp")
+        with requests.get(self.base_url + name, stream=True, timeout=30) as response:
+            response.raise_for_status()
+            with open(tmp, "wb") as f:
+                for chunk in response.iter_content(1 << 20):
+                    f.write(chunk)
+
+        if tmp.stat().st_size != entry["size"] or file_sha256(tmp) != entry["sha256"]:
+            tmp.unlink()
+            raise ValueError(f"{name} does not match the release manifest")
+        os.replace(tmp, path)
+        return path
+
+    def sync(self):
+        # Fetch every listed file and return the directory holding them; the
+        # copies of older releases are removed once this one is complete
+        for name in self.manifest["files"]:
+            self.path(name)
+        with open(self.directory / "manifest.json", "w") as f:
+            json.dump(self.manifest, f, indent=2)
+        self.prune()
+        return self.directory
+
+    def prune(self):
+        # Removes other release directories: complete ones older than the
+        # current release (the offline fallback then finds this one), and
+        # stale partial downloads. Other directories under root (e.g.
+        # snapshots) hold no release files and are left alone. Processes
+        # still mapping removed files keep reading them until they unmap.
+        current = (self.directory / "manifest.json").stat().st_mtime
+        for directory in self.root.iterdir():
+            if not directory.is_dir() or directory == self.directory:
+                continue
+            manifest = directory / "manifest.json"
+            if manifest.exists():
+                stale = manifest.stat().st_mtime < current
+            else:
+                # Named as path() names its downloads; snapshots' temp
+                # files have no leading dot
+                partial = any(directory.glob(".*.tmp")) or any(
+                    any(directory.glob(pattern)) for pattern in ARTIFACT_PATTERNS
+                )
+                stale = partial and (
+                    time.time() - directory.stat().st_mtime > PRUNE_PARTIAL_AFTER
+                )
+            if stale:
+                shutil.rmtree(directory, ignore_errors=True)
@@ -0,0 +1,84 @@
+from itertools import chain
+import numpy as np
+import pandas as pd
+
+
+class AuthorIndex:
+    # Author names coded as int32 ids, and each paper's authors as a CSR
+    # slice: author_ids[offsets[i]:offsets[i + 1]] are the (distinct)
+    # authors of paper i, in the table's row order. Statistics over any
+    # subset of papers, given as a boolean mask over them, are bincounts of
+    # the masked slices; no list column is exploded after the build.
+    def __init__(self, names, offsets, author_ids):
+        self.names = names
+        self.offsets = offsets
+        self.author_ids = author_ids
+        self.lengths = np.diff(offsets)
+        # Paper row of every entry of author_ids
+        self.papers = np.repeat(
+            np.arange(len(self.lengths), dtype=np.int32), self.lengths
+        )
+
+    @classmethod
+    def build(cls, authors):
+        # authors: Series of lists of names per paper (None: no authors);
+        # missing names inside a list are dropped, as explode().nunique() did
+        lists = [
+            () if names is None else dict.fromkeys(n for n in names if not pd.isna(n))
+            for names in authors
+        ]
+        lengths = np.fromiter(map(len, lists), dtype=np.int64, count=len(lists))
+        codes, names = pd.factorize(
+            pd.Series(list(chain.from_iterable(lists)), dtype=object)
+        )
+        offsets = np.zeros(len(lists) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        return cls(np.asarray(names, dtype=object), offsets, codes.astype(np.int32))
+
+    def __len__(self):
+        return len(self.names)
+
+    def _entries(self, rows):
+        # Entries of author_ids belonging to the papers selected by `rows`
+        return slice(None) if rows is None else np.repeat(rows, self.lengths)
+
+    def paper_counts(self, rows=None):
+        # Papers per author id among the selected papers
+        return np.bincount(self.author_ids[self._entries(rows)], minlength=len(self))
+
+    def count(self, rows=None):
+        # Distinct authors of the selected papers
+        return int(np.count_nonzero(self.paper_counts(rows)))
+
+    def group_counts(self, rows=None):
+        # Number of authors per paper count, like
+        # authors.explode().value_counts().value_counts().sort_index()
+        counts = np.bincount(self.paper_counts(rows))
+        counts[0] = 0
+        paper_count = np.flatnonzero(counts)
+        return pd.Series(counts[paper_count], index=pd.Index(paper_count, name="count"))
+
+    def top(self, n, rows=None):
+        # (ids, paper counts) of the n authors with the most selected papers
+        counts = self.paper_counts(rows)
+        ids = np.argsort(-counts, kind="stable")[:n]
+        ids = ids[counts[ids] > 0]
+        return ids, counts[ids]
+
+    def values_of(self, ids, values, rows=None):
+        # Distinct values (a Series over papers, e.g. their field) of each
+        # given author's selected papers: {id: sorted values}
+        codes, uniques = pd.factorize(values, sort=True)
+        entries = np.isin(self.author_ids, ids)
+        if rows is not None:
+            entries &= np.repeat(rows, self.lengths)
+        paper_codes = codes[self.papers[entries]]
+        keys = self.author_ids[entries].astype(np.int64) * (len(uniques) + 1) + (
+            paper_codes + 1
+        )
+        authors, value_codes = np.divmod(np.unique(keys), len(uniques) + 1)
+        found = {int(author): [] for author in ids}
+        for author, code in zip(authors, value_codes):
+            if code:
+                found[int(author)].append(uniques[code - 1])
+        return found
@@ -0,0 +1,107 @@
+import json
+from pathlib import Path
+import numpy as np
+from sklearn.feature_extraction.text import CountVectorizer
+
+K1 = 1.2
+B = 0.75
+
+
+def make_vectorizer(vocabulary=None):
+    # Same tokenization at build and query time
+    return CountVectorizer(stop_words="english", vocabulary=vocabulary)
+
+
+class BM25Index:
+    # Inverted index over the vector store rows, stored CSR style by term:
+    # the postings of term t are rows indices[indptr[t]:indptr[t + 1]] with
+    # term frequencies tf[...]. The per-row length normalization is folded
+    # into doc_norm at build time, so a query only reads its terms' postings.
+    def __init__(self, vocabulary, indptr, indices, tf, idf, doc_norm):
+        self.vocabulary = vocabulary
+        self.indptr = indptr
+        self.indices = indices
+        self.tf = tf
+        self.idf = idf
+        self.doc_norm = doc_norm
+        self._analyzer = make_vectorizer(vocabulary).build_analyzer()
+
+    @classmethod
+    def build(cls, texts):
+        vectorizer = make_vectorizer()
+        counts = vectorizer.fit_transform(texts)
+        postings = counts.T.tocsr()
+        postings.sort_indices()
+
+        n_docs = counts.shape[0]
+        doc_len = np.asarray(counts.sum(axis=1)).ravel()
+        doc_freq = np.diff(postings.indptr)
+        idf = np.log(1 + (n_docs - doc_freq + 0.5) / (doc_freq + 0.5))
+        doc_norm = K1 * (1 - B + B * doc_len / max(doc_len.mean(), 1))
+
+        return cls(
+            {term: int(i) for term, i in vectorizer.vocabulary_.items()},
+            postings.indptr.astype(np.int64),
+            postings.indices.astype(np.int32),
+            postings.data.astype(np.uint16),
+            idf.astype(np.float32),
+            doc_norm.astype(np.float32),
+        )
+
+    @classmethod
+    def load(cls, directory, mmap_mode=None):
+        directory = Path(directory)
+        with open(directory / "bm25.vocabulary.json") as f:
+            vocabulary = json.load(f)
+        return cls(
+            vocabulary,
+            *(
+                np.asarray(np.load(directory / f"bm25.{name}.npy", mmap_mode=mmap_mode))
+                for name in ("indptr", "indices", "tf", "idf", "doc_norm")
+            ),
+        )
+
+    @staticmethod
+    def exists(directory):
+        return (Path(directory) / "bm25.vocabulary.json").exists()
+
+    def save(self, directory):
+        directory = Path(directory)
+        for name in ("indptr", "indices", "tf", "idf", "doc_norm"):
+            np.save(directory / f"bm25.{name}.npy", getattr(self, name))
+        with open(directory / "bm25.vocabulary.json", "w") as f:
+            json.dump(self.vocabulary, f)
+
+    def score(self, query):
+        # (rows, scores) of every row containing at least one query term
+        terms = {
+            self.vocabulary[token]
+            for token in self._analyzer(query)
+            if token in self.vocabulary
+        }
+        if not terms:
+            return np.array([], dtype=np.int32), np.array([], dtype=np.float32)
+
+        rows = []
+        weights = []
+        for t in terms:
+            start, stop = self.indptr[t], self.indptr[t + 1]
+            term_rows = self.indices[start:stop]
+            tf = self.tf[start:stop].astype(np.float32)
+            rows.append(term_rows)
+            weights.append(
+                self.idf[t] * tf * (K1 + 1) / (tf + self.doc_norm[term_rows])
+            )
+
+        rows, inverse = np.unique(np.concatenate(rows), return_inverse=True)
+        return rows, np.bincount(inverse, weights=np.concatenate(weights))
+
+    def top_rows(self, query, n, within=None):
+        # Up to n best matching rows (sorted by row), optionally only `within`
+        rows, scores = self.score(query)
+        if within is not None:
+            keep = np.isin(rows, within, assume_unique=True)
+            rows, scores = rows[keep], scores[keep]
+        if len(rows) > n:
+            rows = np.sort(rows[np.argpartition(-scores, n - 1)[:n]])
+        return rows
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+
+
+class CountCube:
+    # Paper counts for every combination of a few low-cardinality columns
+    # (e.g. year x field x country x source), as a dense int32 array with
+    # one label Index per axis. Widgets sum slices of it instead of grouping
+    # paper rows. A paper with several values in a column (the subject areas
+    # of a Scopus paper) counts once under each, so summing over such an axis
+    # overcounts; give those papers a label of their own for totals instead.
+    def __init__(self, labels, counts):
+        self.labels = labels
+        self.counts = counts
+
+    @classmethod
+    def build(cls, **columns):
+        # columns: axis name -> Series of values (or lists of values), all
+        # aligned on the same papers. Missing values get a NaN label.
+        frame = pd.DataFrame(columns).reset_index(drop=True)
+        for name, values in columns.items():
+            if values.map(lambda value: isinstance(value, (list, np.ndarray))).any():
+                frame = frame.explode(name)
+
+        labels = {}
+        codes = []
+        for name in columns:
+            axis_codes, axis_labels = pd.factorize(
+                frame[name], sort=True, use_na_sentinel=False
+            )
+            labels[name] = pd.Index(axis_labels, name=name)
+            codes.append(axis_codes)
+
+        shape = tuple(len(axis_labels) for axis_labels in labels.values())
+        flat = np.ravel_multi_index(codes, shape) if len(frame) else []
+        counts = np.bincount(flat, minlength=int(np.prod(shape))).astype(np.int32)
+        return cls(labels, counts.reshape(shape))
+
+    def _slice(self, selected):
+        # Counts restricted to the selected labels (None or missing: all)
+        counts = self.counts
+        labels = dict(self.labels)
+        for axis, name in enumerate(self.labels):
+            values = selected.get(name)
+            if values is None:
+                continue
+            positions = self.labels[name].get_indexer(list(values))
+            positions = positions[positions >= 0]
+            counts = np.take(counts, positions, axis=axis)
+            labels[name] = self.labels[name][positions]
+        return labels, counts
+
+    def total(self, **selected):
+        return int(self._slice(selected)[1].sum())
+
+    def count_by(self, by, dropna=True, **selected):
+        # Counts per label of `by` (a name or a list of names), summed over
+        # the other axes; only labels with papers (and unless dropna=False,
+        # not missing) are kept
+        by = [by] if isinstance(by, str) else list(by)
+        labels, counts = self._slice(selected)
+        names = list(labels)
+        other = tuple(axis for axis, name in enumerate(names) if name not in by)
+        kept = [name for name in names if name in by]
+        summed = counts.sum(axis=other).transpose([kept.index(name) for name in by])
+
+        if len(by) == 1:
+            index = labels[by[0]]
+        else:
+            index = pd.MultiIndex.from_product([labels[name] for name in by])
+        series = pd.Series(summed.ravel(), index=index, name="count")
+        series = series[series > 0]
+        if dropna:
+            missing = pd.DataFrame(index=series.index).reset_index().isna().any(axis=1)
+            series = series[~missing.to_numpy()]
+        return series
@@ -0,0 +1,189 @@
+import pandas as pd
+import pyarrow.compute as pc
+import sqlalchemy
+import streamlit as st
+from authors import AuthorIndex
+from cube import CountCube
+from snapshots import DEFAULT_DIRECTORY, TableSnapshot
+from subjects import SubjectIndex
+
+SCOPUS = "papers_scopus"
+ARXIV = "papers_arxiv"
+# Column holding the publication year, per table
+YEAR_COLUMNS = {SCOPUS: "bib_pub_year", ARXIV: "year"}
+# Compact dtypes for the columns that have one; the rest keep what Arrow
+# converts them to (lists stay object columns)
+DTYPES = {
+    "bib_pub_year": "Int16",
+    "year": "Int16",
+    "funding_count": "float32",
+    "affiliation_country": "category",
+    "field": "category",
+    "source": "category",
+}
+# Field label counting every paper of a source once, as in the pages' field
+# selectors (Scopus papers also count under each of their subject areas)
+ALL_FIELDS = {SCOPUS: "0", ARXIV: "all"}
+SOURCES = {SCOPUS: "scopus", ARXIV: "arxiv"}
+# How often a process asks the database whether a table changed
+SNAPSHOT_CHECK_SECONDS = 10 * 60
+
+
+@st.cache_resource
+def connect_db():
+    # One engine (and connection pool) for every page of the process
+    return sqlalchemy.create_engine(st.secrets["DB_URL"])
+
+
+@st.cache_resource
+def snapshots():
+    return TableSnapshot(
+        connect_db(), st.secrets.get("SNAPSHOT_DIR", DEFAULT_DIRECTORY)
+    )
+
+
+@st.cache_resource(ttl=SNAPSHOT_CHECK_SECONDS)
+def open_snapshot(table):
+    # (version, memory-mapped Arrow table); the database is only asked for
+    # the table's fingerprint unless it changed since the local snapshot
+    version = snapshots().sync(table)
+    return version, snapshots().open(table)
+
+
+def _year_mask(arrow, table, years):
+    year = arrow[YEAR_COLUMNS[table]]
+    return pc.and_(pc.greater_equal(year, years[0]), pc.less_equal(year, years[1]))
+
+
+def load_papers(table, columns, years=None, snapshot=None):
+    # Only `columns` of `table`; with years=(start, end) only papers published
+    # in that range. Without years the frame is the shared cached one: read
+    # it, never modify it. snapshot: (version, arrow) from open_snapshot, so
+    # that every loader of one rerun reads the same snapshot even if it is
+    # refreshed meanwhile (the default opens the current one).
+    version, arrow = snapshot or open_snapshot(table)
+    papers = _load_columns(arrow, table, version, tuple(columns))
+    if years is None:
+        return papers
+    mask = pc.fill_null(_year_mask(arrow, table, years), False)
+    return papers[mask.to_numpy(zero_copy_only=False)]
+
+
+@st.cache_resource
+def _load_columns(_arrow, table, version, columns):
+    # Every paper's `columns`, converted once per snapshot version and shared
+    # by all sessions; year ranges are masked from it per rerun. `version`
+    # keys the cache, so a refreshed snapshot is never served stale.
+    papers = _arrow.select(list(columns)).to_pandas()
+    return papers.astype(
+        {column: dtype for column, dtype in DTYPES.items() if column in papers}
+    )
+
+
+def subject_areas(codes):
+    # Two-digit areas of a Scopus paper's four-digit subject codes
+    if codes is None:
+        return []
+    return sorted({str(int(code) // 100) for code in codes})
+
+
+def scopus_fields(codes):
+    # Field selections a Scopus paper counts under: all fields and each of
+    # its subject areas. The count cube, the subject bitmaps and so every
+    # Scopus widget share this one membership.
+    return [ALL_FIELDS[SCOPUS], *subject_areas(codes)]
+
+
+def load_cubes():
+    # "papers": counts over year x field x country x source of both tables;
+    # "subjects": Scopus counts over year x subject name
+    scopus_version, scopus = open_snapshot(SCOPUS)
+    arxiv_version, arxiv = open_snapshot(ARXIV)
+    return _build_cubes(scopus, arxiv, scopus_version, arxiv_version)
+
+
+@st.cache_resource
+def _build_cubes(_scopus, _arxiv, scopus_version, arxiv_version):
+    # Built once per pair of snapshot versions, then shared read-only
+    scopus = load_papers(
+        SCOPUS,
+        ["bib_pub_year", "subject_codes", "subject_names", "affiliation_country"],
+        snapshot=(scopus_version, _scopus),
+    )
+    arxiv = load_papers(ARXIV, ["year", "field"], snapshot=(arxiv_version, _arxiv))
+
+    papers = CountCube.build(
+        year=pd.concat([scopus["bib_pub_year"], arxiv["year"]], ignore_index=True),
+        field=pd.concat(
+            [
+                scopus["subject_codes"].map(scopus_fields),
+                arxiv["field"]
+                .astype(object)
+                .map(lambda field: [ALL_FIELDS[ARXIV], field]),
+            ],
+            ignore_index=True,
+        ),
+        country=pd.concat(
+            [
+                scopus["affiliation_country"].astype(object),
+                pd.Series(None, index=arxiv.index, dtype=object),
+            ],
+            ignore_index=True,
+        ),
+        source=pd.Series(
+            [SOURCES[SCOPUS]] * len(scopus) + [SOURCES[ARXIV]] * len(arxiv)
+        ),
+    )
+    subjects = CountCube.build(
+        year=scopus["bib_pub_year"],
+        subject=scopus["subject_names"].map(
+            lambda names: [] if names is None else list(set(names))
+        ),
+    )
+    return {"papers": papers, "subjects": subjects}
+
+
+def load_authors(table, snapshot=None):
+    # (AuthorIndex over every paper of `table`, in snapshot row order; the
+    # year (and arXiv field) of the same papers, to select rows of it by)
+    version, arrow = snapshot or open_snapshot(table)
+    return _build_authors(arrow, table, version)
+
+
+@st.cache_resource
+def _build_authors(_arrow, table, version):
+    # Scopus fields are subject areas, selected through load_subjects
+    columns = [YEAR_COLUMNS[table], "authors"] + (["field"] if table == ARXIV else [])
+    papers = load_papers(table, columns, snapshot=(version, _arrow))
+    rows = papers.drop(columns="authors").rename(columns={YEAR_COLUMNS[table]: "year"})
+    return AuthorIndex.build(papers["authors"]), rows
+
+
+def load_subjects(snapshot=None):
+    # SubjectIndex over every Scopus paper, in snapshot row order
+    version, arrow = snapshot or open_snapshot(SCOPUS)
+    return _build_subjects(arrow, version)
+
+
+@st.cache_resource
+def _build_subjects(_arrow, version):
+    # Papers sharing a title count once per field in the funding means, as
+    # the page's drop_duplicates on title and subject did
+    papers = load_papers(SCOPUS, ["subject_codes", "title"], snapshot=(version, _arrow))
+    return SubjectIndex.build(
+        papers["subject_codes"].map(scopus_fields), groups=papers["title"]
+    )
+
+
+def paper_mask(papers, table, years, field=None, snapshot=None):
+    # Boolean mask over `papers` (from load_authors with the same snapshot)
+    # of those published in years=(start, end) and, unless field is None,
+    # counted under `field` as in the count cube
+    mask = papers["year"].between(*years).to_numpy(dtype=bool, na_value=False)
+    if field is None:
+        return mask
+    if table == SCOPUS:
+        mask &= load_subjects(snapshot).mask(field)
+    elif field != ALL_FIELDS[table]:
+        mask &= (papers["field"] == field).to_numpy()
+    return mask
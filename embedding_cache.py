@@ -0,0 +1,87 @@
+import hashlib
+from pathlib import Path
+import numpy as np
+
+
+def text_key(text):
+    return hashlib.sha1(text.encode("utf-8")).digest()
+
+
+class EmbeddingCache:
+    # On-disk cache of text embeddings for one model, keyed by a SHA-1 of the
+    # text. It is append only: every put() writes a new shard pair
+    # (NNNNN.keys.npy, NNNNN.vectors.npy) and old shards are never rewritten.
+    # Shard vectors are memory mapped; only the sorted key array lives in RAM.
+    def __init__(self, root, model_name, dim):
+        self.path = Path(root) / model_name.replace("/", "__")
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.dim = dim
+        self.hits = 0
+        self.misses = 0
+
+        self._shards = []
+        keys = [np.array([], dtype="S20")]
+        shard = [np.array([], dtype=np.int32)]
+        row = [np.array([], dtype=np.int64)]
+        for keys_path in sorted(self.path.glob("*.keys.npy")):
+            vectors_path = keys_path.with_name(
+                keys_path.name.replace(".keys.", ".vectors.")
+            )
+            keys.append(np.load(keys_path))
+            shard.append(np.full(len(keys[-1]), len(self._shards), dtype=np.int32))
+            row.append(np.arange(len(keys[-1]), dtype=np.int64))
+            self._shards.append(np.load(vectors_path, mmap_mode="r"))
+        self._set_index(
+            np.concatenate(keys), np.concatenate(shard), np.concatenate(row)
+        )
+
+    def _set_index(self, keys, shard, row):
+        order = np.argsort(keys, kind="stable")
+        self._keys = keys[order]
+        self._shard = shard[order]
+        self._row = row[order]
+
+    def __len__(self):
+        return len(self._keys)
+
+    def get(self, texts):
+        # Returns (vectors, missing): an (n, dim) float32 array with the cached
+        # rows filled in, and a mask of the texts that still need encoding.
+        keys = np.array([text_key(text) for text in texts], dtype="S20")
+        vectors = np.zeros((len(keys), self.dim), dtype=np.float32)
+
+        pos = np.searchsorted(self._keys, keys)
+        found = pos < len(self._keys)
+        found[found] = self._keys[pos[found]] == keys[found]
+
+        for shard_id in np.unique(self._shard[pos[found]]):
+            in_shard = found.copy()
+            in_shard[found] = self._shard[pos[found]] == shard_id
+            vectors[in_shard] = self._shards[shard_id][self._row[pos[in_shard]]]
+
+        self.hits += int(found.sum())
+        self.misses += int((~found).sum())
+        return vectors, ~found
+
+    def put(self, texts, vectors):
+        keys = np.array([text_key(text) for text in texts], dtype="S20")
+        keys, first = np.unique(keys, return_index=True)
+        known = np.isin(keys, self._keys)
+        keys, first = keys[~known], first[~known]
+        if len(keys) == 0:
+            return
+
+        name = f"{len(self._shards):05d}"
+        shard_vectors = np.asarray(vectors, dtype=np.float32)[first]
+        np.save(self.path / f"{name}.vectors.npy", shard_vectors)
+        # Keys last: a shard only counts once its keys file exists
+        np.save(self.path / f"{name}.keys.npy", keys)
+
+        self._shards.append(np.load(self.path / f"{name}.vectors.npy", mmap_mode="r"))
+        self._set_index(
+            np.concatenate([self._keys, keys]),
+            np.concatenate(
+                [self._shard, np.full(len(keys), len(self._shards) - 1, np.int32)]
+            ),
+            np.concatenate([self._row, np.arange(len(keys), dtype=np.int64)]),
+        )
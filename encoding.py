@@ -0,0 +1,122 @@
+import multiprocessing
+import os
+import time
+import numpy as np
+import torch
+from sbert import load_model
+
+# Streaming, multi-process encoder for the offline vector generation. Texts
+# are sorted by length and cut into chunks, so every batch the model sees has
+# similar-length texts (little padding). Chunks are encoded by a pool of CPU
+# workers and written straight into an (n, dim) float32 .npy memmap at their
+# original positions, so only a few chunks are ever held in memory.
+
+_worker_model = None
+
+
+def _init_worker(model_name, threads):
+    global _worker_model
+    # One process per core group instead of every worker using every core
+    torch.set_num_threads(threads)
+    _worker_model = load_model(model_name)
+
+
+def _encode_chunk(task):
+    positions, texts, batch_size = task
+    vectors = _worker_model.encode(texts, batch_size=batch_size, convert_to_numpy=True)
+    return positions, vectors
+
+
+def length_buckets(texts, positions, chunk_size):
+    order = positions[np.argsort([len(texts[i]) for i in positions], kind="stable")]
+    return [order[i : i + chunk_size] for i in range(0, len(order), chunk_size)]
+
+
+def encode_to_file(
+    texts,
+    model_name,
+    path,
+    batch_size=32,
+    chunk_size=1024,
+    n_workers=None,
+    cache=None,
+    label="texts",
+    cache_flush=65_536,
+):
+    texts = list(texts)
+    model = load_model(model_name)
+    dim = model.get_sentence_embedding_dimension()
+    out = np.lib.format.open_memmap(
+        path, mode="w+", dtype=np.float32, shape=(len(texts), dim)
+    )
+
+    # Cached vectors are copied over chunk by chunk; only misses get encoded
+    if cache is not None:
+        hits, misses = cache.hits, cache.misses
+    todo = []
+    for start in range(0, len(texts), chunk_size):
+        stop = min(start + chunk_size, len(texts))
+        if cache is None:
+            todo.append(np.arange(start, stop))
+            continue
+        vectors, missing = cache.get(texts[start:stop])
+        out[start:stop][~missing] = vectors[~missing]
+        todo.append(start + np.flatnonzero(missing))
+    todo = np.concatenate(todo) if todo else np.array([], dtype=np.int64)
+
+    if cache is not None:
+        print(
+            f"{label}: embedding cache {cache.hits - hits:,} hits, "
+            f"{cache.misses - misses:,} misses"
+        )
+
+    tasks = (
+        (positions, [texts[i] for i in positions], batch_size)
+        for positions in length_buckets(texts, todo, chunk_size)
+    )
+
+    n_workers = n_workers or os.cpu_count()
+    if n_workers > 1 and len(todo) > chunk_size:
+        threads = max(1, os.cpu_count() // n_workers)
+        # Spawned, not forked: this process already holds the model and
+        # torch's threads, which forked children would inherit mid-state
+        pool = multiprocessing.get_context("spawn").Pool(
+            n_workers, initializer=_init_worker, initargs=(model_name, threads)
+        )
+        results = pool.imap_unordered(_encode_chunk, tasks)
+    else:
+        pool = None
+        _init_worker(model_name, torch.get_num_threads())
+        results = map(_encode_chunk, tasks)
+
+    # New vectors are added to the cache in large shards, not one per chunk
+    pending = []
+
+    def flush_pending():
+        if pending:
+            positions = np.concatenate(pending)
+            cache.put([texts[i] for i in positions], out[positions])
+            pending.clear()
+
+    started = time.perf_counter()
+    done = 0
+    try:
+        for positions, vectors in results:
+            out[positions] = vectors
+            if cache is not None:
+                pending.append(positions)
+                if sum(map(len, pending)) >= cache_flush:
+                    flush_pending()
+
+            done += len(positions)
+            rate = done / (time.perf_counter() - started)
+            print(f"{label}: {done:,}/{len(todo):,} encoded, {rate:,.0f} texts/s")
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    if cache is not None:
+        flush_pending()
+    out.flush()
+    return out
@@ -0,0 +1,75 @@
+import json
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+
+class FilterIndex:
+    # One bitmap per (column, value) over the vector store rows, packed eight
+    # rows per byte. A filter ORs the bitmaps of the selected values within a
+    # column and ANDs across columns, so a narrow filter yields the few rows
+    # worth scoring without touching paper metadata at query time.
+    def __init__(self, n_rows, labels, bitmaps):
+        self.n_rows = n_rows
+        self.labels = labels
+        self.bitmaps = bitmaps
+
+    @classmethod
+    def build(cls, **columns):
+        # columns: name -> Series over the store rows (in row order); a value
+        # may be a list, e.g. the several subject areas of one paper
+        n_rows = None
+        labels = {}
+        bitmaps = {}
+        for column, values in columns.items():
+            n_rows = len(values)
+            exploded = pd.Series(list(values)).explode().dropna().astype(str)
+            labels[column] = sorted(exploded.unique())
+            codes = pd.Index(labels[column]).get_indexer(exploded)
+
+            bits = np.zeros((len(labels[column]), n_rows), dtype=bool)
+            bits[codes, exploded.index.to_numpy()] = True
+            bitmaps[column] = np.packbits(bits, axis=1)
+        return cls(n_rows, labels, bitmaps)
+
+    @classmethod
+    def load(cls, directory, mmap_mode=None):
+        directory = Path(directory)
+        with open(directory / "filters.json") as f:
+            meta = json.load(f)
+        bitmaps = {
+            column: np.asarray(
+                np.load(directory / f"filter.{column}.npy", mmap_mode=mmap_mode)
+            )
+            for column in meta["labels"]
+        }
+        return cls(meta["n_rows"], meta["labels"], bitmaps)
+
+    @staticmethod
+    def exists(directory):
+        return (Path(directory) / "filters.json").exists()
+
+    def save(self, directory):
+        directory = Path(directory)
+        for column, bitmap in self.bitmaps.items():
+            np.save(directory / f"filter.{column}.npy", bitmap)
+        with open(directory / "filters.json", "w") as f:
+            json.dump({"n_rows": self.n_rows, "labels": self.labels}, f)
+
+    def rows(self, **selected):
+        # Store rows matching every given column (None or missing: no filter)
+        packed = None
+        for column, values in selected.items():
+            if values is None:
+                continue
+            lookup = {label: i for i, label in enumerate(self.labels[column])}
+            codes = [lookup[str(v)] for v in values if str(v) in lookup]
+            if codes:
+                column_bits = np.bitwise_or.reduce(self.bitmaps[column][codes], axis=0)
+            else:
+                column_bits = np.zeros(self.bitmaps[column].shape[1], dtype=np.uint8)
+            packed = column_bits if packed is None else packed & column_bits
+
+        if packed is None:
+            return None
+        return np.flatnonzero(np.unpackbits(packed, count=self.n_rows))
@@ -1,5 +1,4 @@
 import streamlit as st
-import sqlalchemy
 import pandas as pd
 import plotly.express as px
 import json
@@ -7,22 +6,17 @@ import numpy as np
 from assets.subject_data import subject_overall_dict
 import altair as alt
 from sklearn.feature_extraction.text import CountVectorizer
-
-
-@st.cache_resource
-def connect_db():
-    return sqlalchemy.create_engine(st.secrets["DB_URL"])
-
-
-@st.cache_data
-def load():
-    engine = connect_db()
-
-    with engine.begin() as conn:
-        return pd.read_sql_table("papers_scopus", conn)
-
-
-df = load()
+from data import (
+    ALL_FIELDS,
+    SCOPUS,
+    SOURCES,
+    load_authors,
+    load_cubes,
+    load_papers,
+    load_subjects,
+    open_snapshot,
+    paper_mask,
+)
 
 
 st.html(
@@ -58,9 +52,6 @@ st.html(
 )
 
 
-# st.write(df["subject_codes"].map(lambda x :str(x)[1:3]))
-df["two_digits"] = df["subject_codes"].map(lambda x: str(x)[1:3])
-# st.write(df['subject_names'].map(set).explode().value_counts())
 st.title("Scopus Data")
 
 
@@ -85,23 +76,31 @@ with st.sidebar:
     start, end = st.slider("", 2018, 2023, (2018, 2023), label_visibility="collapsed")
     st.write("From", str(start), "to", str(end))
 
+# Counts come from the count cube; paper rows only for what needs them
+cubes = load_cubes()
+selected = dict(year=range(start, end + 1), source=[SOURCES[SCOPUS]])
+# One snapshot for every row-aligned loader of this rerun, even if the
+# table is refreshed meanwhile
+snapshot = open_snapshot(SCOPUS)
+df = load_papers(
+    SCOPUS, ["bib_abstract", "funding_count"], (start, end), snapshot=snapshot
+)
+
 col1, col2 = st.columns([1, 1])
 
-total_paper = 0
-num_authors = 0
-num_countries = 0
+total_paper = cubes["papers"].total(field=[field], **selected)
+num_countries = len(cubes["papers"].count_by("country", field=[field], **selected))
 
-df = df[(df["bib_pub_year"] >= start) & (df["bib_pub_year"] <= end)]
-if field == "0":
-    total_paper = df.shape[0]
-    num_authors = df["authors"].explode().nunique()
-    num_countries = df["affiliation_country"].nunique()
-    df_author = df
-else:
-    total_paper = df[df["two_digits"] == field].shape[0]
-    num_authors = df[df["two_digits"] == field]["authors"].explode().nunique()
-    num_countries = df[df["two_digits"] == field]["affiliation_country"].nunique()
-    df_author = df[df["two_digits"] == field]
+# Author statistics come from the author index, and field filters from the
+# subject bitmaps, over the selected papers; every widget counts a paper
+# under all of its subject areas, as the count cube does
+authors, author_papers = load_authors(SCOPUS, snapshot)
+subjects = load_subjects(snapshot)
+author_rows = paper_mask(author_papers, SCOPUS, (start, end), field, snapshot)
+num_authors = authors.count(author_rows)
+# Papers of df, which has the same year filter, among the snapshot rows
+year_rows = paper_mask(author_papers, SCOPUS, (start, end))
+df_author = df[subjects.mask(field, year_rows)]
 
 
 st.html(
@@ -113,7 +112,11 @@ st.html(
     """
 )
 
-df2 = df["subject_names"].map(set).explode().value_counts()
+df2 = (
+    cubes["subjects"]
+    .count_by("subject", year=selected["year"])
+    .sort_values(ascending=False)
+)
 st.header("🥇 Percentage of Papers per Field")
 tab1, tab2 = st.tabs(["Pie Chart", "Bar Chart"])
 
@@ -149,7 +152,13 @@ st.divider()
 
 # Number of Paper per Country Choropleth Map
 st.header("🌏 Number of Paper per Country Choropleth Map")
-countries_df = df["affiliation_country"].dropna().value_counts().reset_index()
+countries_df = (
+    cubes["papers"]
+    .count_by("country", field=["0"], **selected)
+    .sort_values(ascending=False)
+    .rename_axis("affiliation_country")
+    .reset_index()
+)
 countries_df["Log"] = np.log(countries_df["count"])
 with open("assets/custom.geo.json", encoding="utf8") as f:
     geojson = json.load(f)
@@ -239,9 +248,7 @@ st.plotly_chart(fig, use_container_width=True)
 st.divider()
 st.header("🔎 Author Grouped by Paper Count")
 
-df_authors = df_author["authors"].explode()
-author_counts = df_authors.value_counts()
-group_counts = author_counts.value_counts().sort_index()
+group_counts = authors.group_counts(author_rows)
 paper_count = group_counts.index
 
 fig = px.bar(
@@ -264,15 +271,12 @@ st.plotly_chart(fig, theme="streamlit")
 st.divider()
 st.header("💰 Ranking Fields by Avg. Funding Count")
 # ranking fields by avg funding/paper
-df2 = df.explode("subject_codes")
-df2["subject_codes"] = (df2["subject_codes"].apply(lambda x: x // 100)).astype(str)
-df2.drop_duplicates(subset=["title", "subject_codes"], inplace=True)
-df2["funding_count"].fillna(value=0, inplace=True)
-df2 = df2[["subject_codes", "funding_count"]]
 df2 = (
-    df2.groupby(by=["subject_codes"])
-    .mean()
-    .sort_values(by="funding_count", ascending=False)
+    subjects.means(df["funding_count"].fillna(0), year_rows)
+    .drop(ALL_FIELDS[SCOPUS], errors="ignore")
+    .rename("funding_count")
+    .rename_axis("subject_codes")
+    .sort_values(ascending=False)
     .reset_index()
 )
 df2["Field"] = df2["subject_codes"].map(subject_overall_dict)
@@ -1,26 +1,19 @@
 import streamlit as st
-import sqlalchemy
 import pandas as pd
 import plotly.express as px
 import numpy as np
 from assets.subject_data import fields_dict
 from sklearn.feature_extraction.text import CountVectorizer
-
-
-@st.cache_resource
-def connect_db():
-    return sqlalchemy.create_engine(st.secrets["DB_URL"])
-
-
-@st.cache_data
-def load_scraped():
-    engine = connect_db()
-
-    with engine.begin() as conn:
-        return pd.read_sql_table("papers_arxiv", conn)
-
-
-df_scraped = load_scraped()
+from data import (
+    ARXIV,
+    ALL_FIELDS,
+    SOURCES,
+    load_authors,
+    load_cubes,
+    load_papers,
+    open_snapshot,
+    paper_mask,
+)
 
 
 st.html(
@@ -77,16 +70,19 @@ with st.sidebar:
     start, end = st.slider("", 2018, 2023, (2018, 2023), label_visibility="collapsed")
     st.write("From", str(start), "to", str(end))
 
-df_scraped = df_scraped[(df_scraped["year"] >= start) & (df_scraped["year"] <= end)]
+# Counts come from the count cube; paper rows only for what needs them
+papers_cube = load_cubes()["papers"]
+selected = dict(year=range(start, end + 1), source=[SOURCES[ARXIV]])
+# One snapshot for every loader of this rerun
+snapshot = open_snapshot(ARXIV)
+df_scraped = load_papers(ARXIV, ["field", "abstract"], (start, end), snapshot=snapshot)
+total_paper = papers_cube.total(field=[field], **selected)
+# Author statistics come from the author index, over the selected papers
+authors, author_papers = load_authors(ARXIV, snapshot)
+num_authors = authors.count(paper_mask(author_papers, ARXIV, (start, end), field))
 if field == "all":
-    total_paper = df_scraped.shape[0]
-    num_authors = df_scraped["authors"].explode().nunique()
     df_author = df_scraped
 else:
-    total_paper = df_scraped[df_scraped["field"] == field].shape[0]
-    num_authors = (
-        df_scraped[df_scraped["field"] == field]["authors"].explode().nunique()
-    )
     df_author = df_scraped[df_scraped["field"] == field]
 
 # st.write(field)
@@ -105,7 +101,11 @@ st.html(
 st.divider()
 
 
-df2 = df_scraped["field"].value_counts()
+df2 = (
+    papers_cube.count_by("field", **selected)
+    .drop(ALL_FIELDS[ARXIV], errors="ignore")
+    .sort_values(ascending=False)
+)
 st.header("🥇 Percentage of Papers per Field")
 tab1, tab2 = st.tabs(["Pie Chart", "Bar Chart"])
 
@@ -188,7 +188,11 @@ st.divider()
 
 st.header("⌛ Research Papers Trend Over Time")
 
-df_trends = df_scraped.groupby(["year", "field"]).size().reset_index(name="count")
+df_trends = (
+    papers_cube.count_by(["year", "field"], **selected)
+    .drop(ALL_FIELDS[ARXIV], level="field", errors="ignore")
+    .reset_index()
+)
 fig = px.line(
     df_trends, x="year", y="count", color="field", title=f"From {start} to {end}"
 )
@@ -199,17 +203,15 @@ st.divider()
 
 
 st.header("📎 Top Authors by Number of Papers")
-df_exploded = df_scraped.explode("authors")
-author_counts = df_exploded.groupby("authors").size().reset_index(name="count")
-author_fields = (
-    df_exploded.groupby("authors")["field"]
-    .apply(lambda x: ", ".join(x.unique()))
-    .reset_index()
-)
-top_authors = (
-    author_counts.merge(author_fields, on="authors")
-    .sort_values(by="count", ascending=False)
-    .head(5)
+year_rows = paper_mask(author_papers, ARXIV, (start, end))
+top_ids, top_counts = authors.top(5, year_rows)
+author_fields = authors.values_of(top_ids, author_papers["field"], year_rows)
+top_authors = pd.DataFrame(
+    {
+        "authors": authors.names[top_ids],
+        "count": top_counts,
+        "field": [", ".join(author_fields[author]) for author in top_ids],
+    }
 )
 
 for index, row in top_authors.iterrows():
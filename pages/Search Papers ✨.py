@@ -1,43 +1,47 @@
 import streamlit as st
-import sqlalchemy
-import pandas as pd
-from sbert import sbert
-from sklearn.metrics.pairwise import cosine_similarity
+from assets.subject_data import subject_overall_dict, fields_dict
+from data import connect_db
+from artifacts import ArtifactCache, DEFAULT_ROOT as DEFAULT_ARTIFACT_ROOT
+from search_results import fetch_paper_details
+from search_service import SearchClient
 
 
 @st.cache_resource
-def connect_db():
-    return sqlalchemy.create_engine(st.secrets["DB_URL"])
-
-
-@st.cache_data
-def load_generated(filename):
-    return pd.read_feather(st.secrets["RELEASES_URL"] + filename)
-
-
-def weighted_mean(values, weights):
-    has_one = False
-    value_sum = 0
-    weight_sum = 0
-
-    for val, w in zip(values, weights):
-        if pd.isna(val):
-            continue
-
-        has_one = True
-
-        value_sum += val * w
-        weight_sum += w
-
-    if not has_one:
-        return pd.NA
-
-    return value_sum / weight_sum
+def load_artifacts():
+    # Downloaded (and checksum-verified) once per release, then memory mapped
+    cache = ArtifactCache(
+        st.secrets["RELEASES_URL"],
+        st.secrets.get("ARTIFACT_CACHE_DIR", DEFAULT_ARTIFACT_ROOT),
+    )
+    return cache.sync()
 
 
-@st.cache_data(ttl=5 * 60)
-def vectorize(text):
-    return sbert.transform(text).reshape(1, -1)
+@st.cache_resource
+def load_search_engine():
+    # With a search service (scripts/serve_search.py) the page only sends it
+    # query text; otherwise the model and vectors are loaded in process
+    if "SEARCH_SERVICE_URL" in st.secrets:
+        return SearchClient(st.secrets["SEARCH_SERVICE_URL"])
+
+    # Imported here so a service client never loads the model's dependencies
+    from sbert import sbert
+    from query_cache import QueryEmbeddingCache
+    from search_engine import SearchEngine, encode_with_sbert
+
+    sbert.warm()
+    query_cache = QueryEmbeddingCache(
+        encode_with_sbert,
+        maxsize=st.secrets.get("QUERY_CACHE_SIZE", 4096),
+        path=st.secrets.get("QUERY_CACHE_DIR"),
+        model_name=sbert.model,
+        disk_maxsize=st.secrets.get("QUERY_CACHE_DISK_SIZE", 100_000),
+    )
+    return SearchEngine.load(
+        load_artifacts(),
+        quantized=st.secrets.get("QUANTIZED_SEARCH", True),
+        dimensions=st.secrets.get("PCA_DIMENSIONS"),
+        query_cache=query_cache,
+    )
 
 
 # @st.cache_data
@@ -61,66 +65,43 @@ def vectorize(text):
 def fetch_details(df):
     engine = connect_db()
     with engine.begin() as conn:
-        return (
-            pd.read_sql_query(
-                "SELECT * FROM combined_minimal WHERE index = ANY(%s)",
-                params=(df.index.to_list(),),
-                con=conn,
-            )
-            .set_index("index")
-            .join(df)
-            .sort_values("overall_similarity", ascending=False)
-        )
-
+        return fetch_paper_details(conn, df)
 
-TITLE_WEIGHT = 1 / 4
-ABSTRACT_WEIGHT = 3 / 4
 
-
-def search(query, title=True, abstract=True):
-    query = query.strip()
-    if len(query.strip()) == 0:
-        return pd.Series([], name="similarity")
-
-    return search_vector(vectorize(query), title, abstract)
+# Number of IVF lists probed per field; 0 forces exact (brute force) search
+ANN_NPROBE = st.secrets.get("ANN_NPROBE", 8)
+# "hybrid": BM25 keyword shortlist reranked by embeddings; "dense": embeddings only
+SEARCH_MODE = st.secrets.get("SEARCH_MODE", "dense")
+# Papers listed under "Suggest similar"
+SUGGEST_K = st.secrets.get("SUGGEST_K", 5)
 
 
 @st.cache_data(ttl=5 * 60)
-def search_vector(query_vector, title, abstract):
-    if title:
-        title_sim_np = cosine_similarity(title_vec, query_vector).flatten()
-    else:
-        title_sim_np = None
-
-    title_similarity = pd.Series(
-        title_sim_np, index=title_vec.index, name="title_similarity"
+def search(
+    query,
+    title=True,
+    abstract=True,
+    k=5,
+    min_score=None,
+    nprobe=ANN_NPROBE,
+    filters=None,
+    hybrid=SEARCH_MODE == "hybrid",
+):
+    return search_engine.search(
+        query, title, abstract, k, min_score, nprobe, filters, hybrid
     )
 
-    if abstract:
-        abstract_sim_np = cosine_similarity(abstract_vec, query_vector).flatten()
-    else:
-        abstract_sim_np = None
 
-    abstract_similarity = pd.Series(
-        abstract_sim_np, index=abstract_vec.index, name="abstract_similarity"
-    )
-
-    similarity = pd.concat([title_similarity, abstract_similarity], axis=1)
+@st.cache_data(ttl=5 * 60)
+def similar(paper, k=5, nprobe=ANN_NPROBE):
+    return search_engine.similar(paper, k, exclude_self=True, nprobe=nprobe)
 
-    similarity["overall_similarity"] = similarity.agg(
-        lambda x: weighted_mean(
-            (x.title_similarity, x.abstract_similarity), (TITLE_WEIGHT, ABSTRACT_WEIGHT)
-        ),
-        axis=1,
-    )
 
-    return similarity
+def format_field(field):
+    return subject_overall_dict.get(field) or fields_dict.get(field) or field
 
 
-abstract_vec = load_generated("abstract_vec.feather")
-title_vec = load_generated("title_vec.feather")
-# sim_mtx = load_generated("similarity_mtx.feather")
-similar_paper_indices = load_generated("similar_papers.feather")
+search_engine = load_search_engine()
 
 st.header("🔎 Paper search and suggestions")
 with st.form("search", border=True):
@@ -133,6 +114,33 @@ with st.form("search", border=True):
         st.form_submit_button(
             "Search", type="primary", use_container_width=True, icon=":material/search:"
         )
+
+    filters = {}
+    filter_labels = search_engine.filter_labels
+    with st.expander("Filters"):
+        # The slider spans the years present in the release; a single year
+        # leaves nothing to filter
+        years = [int(year) for year in filter_labels.get("year", [])]
+        if len(years) > 1:
+            first, last = min(years), max(years)
+            start, end = st.slider("Year of publication", first, last, (first, last))
+            if (start, end) != (first, last):
+                filters["year"] = list(range(start, end + 1))
+        if "source" in filter_labels:
+            sources = st.multiselect(
+                "Source", filter_labels["source"], default=filter_labels["source"]
+            )
+            if len(sources) < len(filter_labels["source"]):
+                filters["source"] = sources
+        if "field" in filter_labels:
+            fields = st.multiselect(
+                "Field",
+                filter_labels["field"],
+                format_func=format_field,
+                placeholder="All fields",
+            )
+            if fields:
+                filters["field"] = fields
 # st.write()
 
 
@@ -150,21 +158,16 @@ SIMILARITY_CRITERION = 0.35
 MIN_SIMILARITY = 0.1
 
 if q:
-    # similarities = df.join(search(q, include_title, include_abstract)).sort_values("overall_similarity", ascending=False)
-    similars = (
-        search(q, include_title, include_abstract)
-        .sort_values("overall_similarity", ascending=False)
-        .head(5)
-    )
-
-    query_vector = vectorize(q) if q else None
-
     showing_more = st.session_state.get("show_more_for") == q
-    if showing_more:
-        criteria = similars.overall_similarity > MIN_SIMILARITY
-    else:
-        criteria = similars.overall_similarity > SIMILARITY_CRITERION
-    matches = fetch_details(similars[criteria])
+    similars = search(
+        q,
+        include_title,
+        include_abstract,
+        k=5,
+        min_score=MIN_SIMILARITY if showing_more else SIMILARITY_CRITERION,
+        filters=filters,
+    )
+    matches = fetch_details(similars)
 else:
     matches = None
 
@@ -200,11 +203,8 @@ def toggle_recommendation(paper):
         #     .head(5)
         #     .rename("overall_similarity")
         # )
-        similar_result = similar_paper_indices.loc[paper.name]
-        similarities = pd.Series(
-            similar_result.similarity, index=similar_result.similar_indices
-        ).rename("overall_similarity")
-        similar_papers = fetch_details(pd.DataFrame(similarities))
+        similarities = similar(paper.name, SUGGEST_K)
+        similar_papers = fetch_details(similarities)
         st.session_state.paper_recommendations[paper.name] = similar_papers
         # recommendations = pd.merge(df, similar, how="inner", left_index=True, right_index=True).sort_values("similarity", ascending=False)
         # st.session_state.paper_recommendations[paper.name] = recommendations.sort_values("similarity", ascending=False).head(5)
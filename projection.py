@@ -0,0 +1,69 @@
+from pathlib import Path
+import numpy as np
+from vector_store import VectorStore, normalize_rows
+
+# Rows per field sampled to fit the projection
+FIT_SAMPLE = 50_000
+# Rows projected at a time
+PROJECT_BLOCK = 65_536
+
+
+class PCAProjection:
+    # Linear map to the top principal directions of the embeddings. It is
+    # fitted without centering, so dot products (and with renormalized rows,
+    # cosine similarities) are preserved as well as `dimensions` allow, and
+    # one projection serves queries and every field alike.
+    def __init__(self, components):
+        self.components = components
+
+    @classmethod
+    def fit(cls, store, dimensions, sample=FIT_SAMPLE, seed=0):
+        rng = np.random.default_rng(seed)
+        rows = []
+        for field in store.fields:
+            present = np.flatnonzero(store.present[field])
+            picked = np.sort(
+                rng.choice(present, min(sample, len(present)), replace=False)
+            )
+            rows.append(store.vectors[field][picked])
+        _, _, vt = np.linalg.svd(np.concatenate(rows), full_matrices=False)
+        return cls(np.ascontiguousarray(vt[:dimensions], dtype=np.float32))
+
+    @classmethod
+    def load(cls, directory, dimensions):
+        return cls(np.load(Path(directory) / f"pca{dimensions}.components.npy"))
+
+    @staticmethod
+    def exists(directory, dimensions):
+        return (Path(directory) / f"pca{dimensions}.components.npy").exists()
+
+    def save(self, directory):
+        np.save(Path(directory) / f"{self.prefix}.components.npy", self.components)
+
+    @property
+    def dimensions(self):
+        return len(self.components)
+
+    @property
+    def prefix(self):
+        return f"pca{self.dimensions}"
+
+    def transform(self, vectors):
+        # Projected, L2-normalized float32 rows
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim == 1:
+            return self.transform(vectors[np.newaxis])[0]
+        out = np.empty((len(vectors), self.dimensions), dtype=np.float32)
+        for start in range(0, len(vectors), PROJECT_BLOCK):
+            stop = start + PROJECT_BLOCK
+            np.matmul(vectors[start:stop], self.components.T, out=out[start:stop])
+        return normalize_rows(out)
+
+    def transform_store(self, store):
+        # The same papers and fields with projected vectors; rows missing a
+        # field stay zero
+        vectors = {}
+        for field in store.fields:
+            vectors[field] = self.transform(store.vectors[field])
+            vectors[field][~store.present[field]] = 0
+        return VectorStore(store.ids, vectors, store.present)
@@ -0,0 +1,88 @@
+from pathlib import Path
+import numpy as np
+
+# Rows converted back to float32 at a time while scoring codes
+SCORE_BLOCK = 512
+
+
+class QuantizedVectors:
+    # Scalar int8 codes for one vector store field: column d of a vector is
+    # stored as round(x_d / scale_d), a quarter of the float32 size. Scores
+    # from the codes are approximate and only pick candidates; the float
+    # vectors rescore those.
+    def __init__(self, codes, scale):
+        self.codes = codes
+        self.scale = scale
+
+    @classmethod
+    def build(cls, vectors):
+        scale = np.abs(vectors).max(axis=0).astype(np.float32) / 127
+        scale[scale == 0] = 1
+        codes = np.empty(vectors.shape, dtype=np.int8)
+        for start in range(0, len(vectors), SCORE_BLOCK):
+            block = np.asarray(vectors[start : start + SCORE_BLOCK]) / scale
+            codes[start : start + SCORE_BLOCK] = np.rint(block).clip(-127, 127)
+        return cls(codes, scale)
+
+    @classmethod
+    def load(cls, directory, field, mmap_mode=None):
+        directory = Path(directory)
+        return cls(
+            np.asarray(
+                np.load(directory / f"quantized.{field}.codes.npy", mmap_mode=mmap_mode)
+            ),
+            np.load(directory / f"quantized.{field}.scale.npy"),
+        )
+
+    @staticmethod
+    def exists(directory, field):
+        return (Path(directory) / f"quantized.{field}.codes.npy").exists()
+
+    @staticmethod
+    def remove(directory, field):
+        for name in ("codes", "scale"):
+            (Path(directory) / f"quantized.{field}.{name}.npy").unlink(missing_ok=True)
+
+    def save(self, directory, field):
+        directory = Path(directory)
+        np.save(directory / f"quantized.{field}.codes.npy", self.codes)
+        np.save(directory / f"quantized.{field}.scale.npy", self.scale)
+
+    def score_many(self, query_vectors, rows=None):
+        # score() for a (queries x dim) matrix: one pass over the codes gives
+        # a (rows x queries) score matrix
+        queries = np.asarray(query_vectors, dtype=np.float32)
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        queries = queries / np.where(norms > 0, norms, 1) * self.scale
+        queries = np.ascontiguousarray(queries.T)
+
+        codes = self.codes if rows is None else self.codes[rows]
+        scores = np.empty((len(codes), len(queries.T)), dtype=np.float32)
+        buffer = np.empty((SCORE_BLOCK, codes.shape[1]), dtype=np.float32)
+        for start in range(0, len(codes), SCORE_BLOCK):
+            block = codes[start : start + SCORE_BLOCK]
+            np.copyto(buffer[: len(block)], block)
+            np.matmul(
+                buffer[: len(block)], queries, out=scores[start : start + len(block)]
+            )
+        return scores
+
+    def score(self, query_vector, rows=None):
+        # Approximate cosine similarity of every row (or only `rows`)
+        query = np.asarray(query_vector, dtype=np.float32).ravel()
+        norm = np.linalg.norm(query)
+        if norm > 0:
+            query = query / norm
+        query = query * self.scale
+
+        codes = self.codes if rows is None else self.codes[rows]
+        scores = np.empty(len(codes), dtype=np.float32)
+        # Small blocks keep the float copy in cache
+        buffer = np.empty((SCORE_BLOCK, codes.shape[1]), dtype=np.float32)
+        for start in range(0, len(codes), SCORE_BLOCK):
+            block = codes[start : start + SCORE_BLOCK]
+            np.copyto(buffer[: len(block)], block)
+            np.matmul(
+                buffer[: len(block)], query, out=scores[start : start + len(block)]
+            )
+        return scores
@@ -0,0 +1,151 @@
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+import numpy as np
+
+
+def normalize_query(text):
+    # all-MiniLM-L6-v2 is uncased and splits on whitespace, so case and
+    # repeated or surrounding whitespace do not change the embedding.
+    return " ".join(text.split()).lower()
+
+
+class QueryEmbeddingCache:
+    # Size-bounded LRU of query embeddings keyed by the normalized query, with
+    # an optional directory of .npy files behind it that survives restarts and
+    # can be shared by several processes (writes are atomic renames). Files
+    # live in a subdirectory per model, so a model change never serves stale
+    # vectors, and the least recently used beyond disk_maxsize are removed
+    # (about 1.6 KB each for 384-dimensional vectors).
+    def __init__(
+        self, encode, maxsize=4096, path=None, model_name=None, disk_maxsize=100_000
+    ):
+        self.encode = encode
+        self.maxsize = maxsize
+        self.disk_maxsize = disk_maxsize
+        self.path = None
+        if path:
+            self.path = Path(path) / (model_name or "default").replace("/", "__")
+            self.path.mkdir(parents=True, exist_ok=True)
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        if self.path is not None:
+            self._prune()
+
+    def _file(self, key):
+        return self.path / f"{hashlib.sha1(key.encode('utf-8')).hexdigest()}.npy"
+
+    def _read(self, key):
+        # The stored vector (None: not stored, removed meanwhile by another
+        # process, or unreadable); its time is refreshed so pruning keeps it
+        try:
+            vector = np.load(self._file(key))
+            os.utime(self._file(key))
+        except (OSError, EOFError, ValueError):
+            return None
+        return vector
+
+    def _prune(self):
+        # Run at start and after every disk_maxsize // 10 writes, not on each
+        def last_used(file):
+            try:
+                return file.stat().st_mtime
+            except FileNotFoundError:
+                return 0
+
+        files = list(self.path.glob("*.npy"))
+        if len(files) <= self.disk_maxsize:
+            return
+        files.sort(key=last_used)
+        for file in files[: len(files) - self.disk_maxsize]:
+            file.unlink(missing_ok=True)
+
+    def _remember(self, key, vector):
+        vector.setflags(write=False)
+        self._entries[key] = vector
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def get(self, text):
+        return self.get_many([text])[0]
+
+    def get_many(self, texts):
+        # Cached vectors are reused; all misses are encoded in one batch
+        keys = [normalize_query(text) for text in texts]
+        found = {}
+        with self._lock:
+            for key in keys:
+                vector = self._entries.get(key)
+                if vector is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    found[key] = vector
+
+        missing = []
+        for key in dict.fromkeys(keys):
+            if key in found:
+                continue
+            vector = None if self.path is None else self._read(key)
+            if vector is not None:
+                found[key] = vector
+                with self._lock:
+                    self.disk_hits += 1
+                    self._remember(key, vector)
+            else:
+                missing.append(key)
+
+        if missing:
+            vectors = np.array(self.encode(missing), dtype=np.float32)
+            with self._lock:
+                self.misses += len(missing)
+                for key, vector in zip(missing, vectors):
+                    found[key] = vector = vector.copy()
+                    self._remember(key, vector)
+
+            if self.path is not None:
+                for key in missing:
+                    # A unique name per writer: sessions of this and other
+                    # processes may store the same query at once
+                    fd, tmp = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+                    try:
+                        with os.fdopen(fd, "wb") as f:
+                            np.save(f, found[key])
+                        os.replace(tmp, self._file(key))
+                    except BaseException:
+                        os.unlink(tmp)
+                        raise
+                with self._lock:
+                    self._writes += len(missing)
+                    prune = self._writes >= max(self.disk_maxsize // 10, 1)
+                    if prune:
+                        self._writes = 0
+                if prune:
+                    self._prune()
+
+        return np.stack([found[key] for key in keys])
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.disk_hits + self.misses
+        return (self.hits + self.disk_hits) / lookups if lookups else 0.0
+
+    def stats(self):
+        return {
+            "size": len(self),
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+        }
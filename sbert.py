@@ -1,10 +1,28 @@
+import threading
+
 import pandas as pd
 from sklearn.base import BaseEstimator, TransformerMixin
 from sentence_transformers import SentenceTransformer
 
+# Process-wide registry so every caller (pages, sessions, scripts) shares one
+# copy of the weights per model name instead of reloading them on each call.
+_models = {}
+_models_lock = threading.Lock()
+
+
+def load_model(name):
+    model = _models.get(name)
+    if model is None:
+        with _models_lock:
+            model = _models.get(name)
+            if model is None:
+                model = SentenceTransformer(name)
+                _models[name] = model
+    return model
+
 
 class SbertEmbedding(TransformerMixin, BaseEstimator):
-    def __init__(self, model, batch_size=1, layer=-1):
+    def __init__(self, model, batch_size=32, layer=-1):
         # From https://lvngd.com/blog/spacy-word-vectors-as-features-in-scikit-learn/
         # For pickling reason you should not load models in __init__
         self.model = model
@@ -14,15 +32,19 @@ class SbertEmbedding(TransformerMixin, BaseEstimator):
     def fit(self, X, y=None):
         return self
 
+    def warm(self):
+        load_model(self.model)
+        return self
+
     def transform(self, X):
-        model = SentenceTransformer(self.model)
+        model = load_model(self.model)
 
         if isinstance(X, (pd.DataFrame, pd.Series)):
             nona = X.dropna()
-            vectors_np = model.encode(nona.array).tolist()
+            vectors_np = model.encode(nona.array, batch_size=self.batch_size).tolist()
             return pd.DataFrame(vectors_np, index=nona.index)
         else:
-            return model.encode(X)
+            return model.encode(X, batch_size=self.batch_size)
 
 
 sbert = SbertEmbedding("all-MiniLM-L6-v2")
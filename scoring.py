@@ -0,0 +1,134 @@
+from concurrent.futures import ProcessPoolExecutor
+from tempfile import TemporaryDirectory
+import multiprocessing
+import os
+import numpy as np
+from threadpoolctl import threadpool_limits
+from vector_store import normalize_rows
+
+
+def weighted_mean(values, weights):
+    # Row-wise weighted mean of an (n, m) array that skips NaN entries, so a
+    # row only averages over the fields it has. Rows with no values are NaN.
+    values = np.asarray(values, dtype=np.float64)
+    weights = np.asarray(weights, dtype=np.float64)
+
+    present = ~np.isnan(values)
+    value_sum = np.where(present, values, 0.0) @ weights
+    weight_sum = present @ weights
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(weight_sum > 0, value_sum / weight_sum, np.nan)
+
+
+def top_k(scores, k, min_score=None):
+    # Positions of the k highest scores, best first, by partial selection
+    # (O(N) instead of sorting everything). NaN scores are never returned and
+    # neither are scores not above `min_score`.
+    scores = np.asarray(scores)
+    k = min(k, len(scores))
+    if k == 0:
+        return np.array([], dtype=np.int64)
+
+    keyed = np.where(np.isnan(scores), -np.inf, scores)
+    top = np.argpartition(-keyed, k - 1)[:k]
+    top = top[np.argsort(-keyed[top], kind="stable")]
+
+    keep = np.isfinite(keyed[top])
+    if min_score is not None:
+        keep &= keyed[top] > min_score
+    return top[keep]
+
+
+# Blocked top-k over the full corpus, for the similar-papers job. Each task
+# scores a block of rows against column tiles of the matrix and only keeps a
+# running top-k per row, so memory is bounded by block_rows * block_cols
+# instead of N * N.
+_worker_matrix = None
+_worker_limits = None
+
+
+def _init_top_k_worker(path, threads):
+    global _worker_matrix, _worker_limits
+    _worker_matrix = np.load(path, mmap_mode="r")
+    # Each worker's BLAS gets its share of the cores, instead of every
+    # worker's matmul starting one thread per core
+    _worker_limits = threadpool_limits(threads, user_api="blas")
+
+
+def _merge_top_k(indices, scores, k):
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    return (
+        np.take_along_axis(indices, top, axis=1),
+        np.take_along_axis(scores, top, axis=1),
+    )
+
+
+def _top_k_rows(start, stop, k, block_cols):
+    matrix = _worker_matrix
+    rows = np.asarray(matrix[start:stop])
+    n_rows = stop - start
+
+    best_indices = np.zeros((n_rows, 0), dtype=np.int64)
+    best_scores = np.zeros((n_rows, 0), dtype=np.float32)
+    for col_start in range(0, len(matrix), block_cols):
+        col_stop = min(col_start + block_cols, len(matrix))
+        scores = rows @ np.asarray(matrix[col_start:col_stop]).T
+
+        # A paper is not its own neighbour
+        own = np.arange(start, stop)
+        in_tile = (own >= col_start) & (own < col_stop)
+        scores[in_tile.nonzero()[0], own[in_tile] - col_start] = -np.inf
+
+        indices = np.broadcast_to(np.arange(col_start, col_stop), scores.shape)
+        best_indices = np.concatenate([best_indices, indices], axis=1)
+        best_scores = np.concatenate([best_scores, scores], axis=1)
+        best_indices, best_scores = _merge_top_k(best_indices, best_scores, k)
+
+    order = np.argsort(-best_scores, axis=1)
+    return (
+        start,
+        np.take_along_axis(best_indices, order, axis=1),
+        np.take_along_axis(best_scores, order, axis=1),
+    )
+
+
+def top_k_similar(vectors, k, block_rows=1024, block_cols=16_384, n_workers=None):
+    # Returns (indices, scores), both (N, k), holding each row's k most
+    # cosine-similar other rows by position, best first.
+    matrix = normalize_rows(np.array(vectors, dtype=np.float32, order="C"))
+    n = len(matrix)
+    k = min(k, n - 1)
+
+    indices = np.empty((n, k), dtype=np.int64)
+    scores = np.empty((n, k), dtype=np.float32)
+
+    with TemporaryDirectory() as tmp:
+        # Workers map the matrix read-only instead of each receiving a copy
+        path = f"{tmp}/vectors.npy"
+        np.save(path, matrix)
+        del matrix
+
+        starts = range(0, n, block_rows)
+        n_workers = n_workers or os.cpu_count()
+        threads = max(1, os.cpu_count() // n_workers)
+        # Spawned, not forked: the caller may hold BLAS or torch threads,
+        # which forked children would inherit mid-state
+        with ProcessPoolExecutor(
+            n_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_top_k_worker,
+            initargs=(path, threads),
+        ) as executor:
+            results = executor.map(
+                _top_k_rows,
+                starts,
+                [min(start + block_rows, n) for start in starts],
+                [k] * len(starts),
+                [block_cols] * len(starts),
+            )
+            for start, block_indices, block_scores in results:
+                indices[start : start + len(block_indices)] = block_indices
+                scores[start : start + len(block_scores)] = block_scores
+
+    return indices, scores
@@ -0,0 +1,77 @@
+# Recall@k and per-query latency of IVF search at several nprobe settings,
+# against exact (brute force) search over the same vectors.
+# Run from the repository root: PYTHONPATH=. python scripts/bench_ann.py
+# (add --synthetic 200000 to benchmark without generated vectors)
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from ann import IVFIndex
+from scoring import weighted_mean
+from vector_store import VectorStore
+
+WEIGHTS = (1 / 4, 3 / 4)
+NPROBES = (1, 2, 4, 8, 16, 32, 64)
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--synthetic", type=int, help="use N random clustered papers")
+parser.add_argument("--queries", type=int, default=200)
+parser.add_argument("-k", type=int, default=10)
+args = parser.parse_args()
+
+rng = np.random.default_rng(0)
+if args.synthetic:
+    topics = rng.normal(size=(1000, 384))
+    topic = rng.integers(len(topics), size=args.synthetic)
+    title_vec = pd.DataFrame(topics[topic] + rng.normal(size=(args.synthetic, 384)))
+    abstract_vec = pd.DataFrame(topics[topic] + rng.normal(size=(args.synthetic, 384)))
+else:
+    title_vec = pd.read_feather("./generated/title_vec.feather")
+    abstract_vec = pd.read_feather("./generated/abstract_vec.feather")
+
+store = VectorStore.from_frames(title=title_vec, abstract=abstract_vec)
+del title_vec, abstract_vec
+
+start = time.perf_counter()
+indexes = {
+    field: IVFIndex.build(store.vectors[field], np.flatnonzero(store.present[field]))
+    for field in store.fields
+}
+print(f"{len(store):,} papers, index build {time.perf_counter() - start:.1f} s")
+
+# Queries are perturbed paper titles, so they land near real data
+queries = store.vectors["title"][rng.choice(len(store), args.queries)]
+queries = queries + rng.normal(scale=0.02, size=queries.shape).astype(np.float32)
+
+
+def top_k(query, rows=None):
+    scores = np.column_stack(
+        [store.score(field, query, rows) for field in store.fields]
+    )
+    overall = np.nan_to_num(weighted_mean(scores, WEIGHTS), nan=-np.inf)
+    top = np.argsort(-overall)[: args.k]
+    return top if rows is None else rows[top]
+
+
+def ann_top_k(query, nprobe):
+    rows = np.unique(
+        np.concatenate([index.candidates(query, nprobe) for index in indexes.values()])
+    )
+    return top_k(query, rows)
+
+
+def run(search):
+    start = time.perf_counter()
+    results = [search(query) for query in queries]
+    return results, (time.perf_counter() - start) / len(queries) * 1000
+
+
+exact, exact_ms = run(top_k)
+print(f"{'exact':>10}: recall@{args.k} 1.000  {exact_ms:7.2f} ms/query")
+
+for nprobe in NPROBES:
+    approx, ms = run(lambda query: ann_top_k(query, nprobe))
+    recall = np.mean(
+        [len(np.intersect1d(a, e)) / args.k for a, e in zip(approx, exact)]
+    )
+    print(f"{f'nprobe={nprobe}':>10}: recall@{args.k} {recall:.3f}  {ms:7.2f} ms/query")
@@ -0,0 +1,54 @@
+# Per-query encode latency, loading the model on every call (old behaviour)
+# vs reusing the process-wide model from sbert.load_model.
+# Run from the repository root: PYTHONPATH=. python scripts/bench_encode.py
+import time
+import statistics
+from sentence_transformers import SentenceTransformer
+from sbert import sbert, load_model
+
+QUERIES = [
+    "use of machine learning in linguistics",
+    "graph neural networks for molecule property prediction",
+    "climate change impact on rice yield in southeast asia",
+    "dark matter halo simulations",
+    "portfolio optimisation with reinforcement learning",
+    "covid-19 vaccine hesitancy survey",
+    "low resource thai speech recognition",
+    "bayesian inference for time series",
+]
+REPEATS = 3
+
+
+def fresh_model_encode(text):
+    return SentenceTransformer(sbert.model).encode(text)
+
+
+def registry_encode(text):
+    return sbert.transform(text)
+
+
+def bench(encode):
+    latencies = []
+    for _ in range(REPEATS):
+        for q in QUERIES:
+            start = time.perf_counter()
+            encode(q)
+            latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    return (
+        statistics.mean(latencies),
+        latencies[len(latencies) // 2],
+        latencies[int(len(latencies) * 0.95)],
+    )
+
+
+start = time.perf_counter()
+load_model(sbert.model)
+print(f"Warm-up (first load): {(time.perf_counter() - start) * 1000:.1f} ms")
+
+for name, encode in [
+    ("fresh model", fresh_model_encode),
+    ("registry", registry_encode),
+]:
+    mean, p50, p95 = bench(encode)
+    print(f"{name:>12}: mean {mean:8.1f} ms  p50 {p50:8.1f} ms  p95 {p95:8.1f} ms")
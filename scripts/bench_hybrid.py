@@ -0,0 +1,75 @@
+# Per-query latency of hybrid search (BM25 shortlist, dense rerank) against
+# exact dense search, and how many of the dense top k hybrid also returns.
+# Queries are encoded once up front, so only the search itself is timed.
+# Run from the repository root: PYTHONPATH=. python scripts/bench_hybrid.py
+# (needs generated/ from scripts/generate_vectors.py, including bm25.*)
+import argparse
+import time
+import numpy as np
+from search_engine import SearchEngine, BM25_SHORTLIST
+
+QUERIES = [
+    "use of machine learning in linguistics",
+    "graph neural networks for molecule property prediction",
+    "climate change impact on rice yield in southeast asia",
+    "dark matter halo simulations",
+    "portfolio optimisation with reinforcement learning",
+    "covid-19 vaccine hesitancy survey",
+    "low resource thai speech recognition",
+    "bayesian inference for time series",
+]
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--directory", default="./generated")
+parser.add_argument("--queries", help="text file with one query per line")
+parser.add_argument("-k", type=int, default=10)
+parser.add_argument("--repeats", type=int, default=3)
+args = parser.parse_args()
+
+engine = SearchEngine.load(args.directory)
+if engine.bm25 is None:
+    raise SystemExit(f"no BM25 index in {args.directory}")
+
+queries = QUERIES
+if args.queries:
+    with open(args.queries) as f:
+        queries = [line.strip() for line in f if line.strip()]
+vectors = engine.vectorize_many(queries)
+print(f"{len(engine.store):,} papers, {len(queries)} queries")
+
+
+def run(hybrid):
+    latencies = []
+    results = []
+    for _ in range(args.repeats):
+        results = []
+        for query, vector in zip(queries, vectors):
+            start = time.perf_counter()
+            result = engine.search_vector(
+                vector, k=args.k, lexical_query=query if hybrid else None
+            )
+            latencies.append((time.perf_counter() - start) * 1000)
+            results.append(result.index)
+    latencies.sort()
+    return results, latencies
+
+
+def bm25_ms():
+    start = time.perf_counter()
+    for query in queries:
+        engine.bm25.top_rows(query, BM25_SHORTLIST)
+    return (time.perf_counter() - start) / len(queries) * 1000
+
+
+dense, dense_ms = run(hybrid=False)
+hybrid, hybrid_ms = run(hybrid=True)
+overlap = np.mean([len(h.intersection(d)) / args.k for h, d in zip(hybrid, dense)])
+
+for name, latencies in (("dense", dense_ms), ("hybrid", hybrid_ms)):
+    print(
+        f"{name:>8}: mean {np.mean(latencies):8.2f} ms"
+        f"  p50 {latencies[len(latencies) // 2]:8.2f} ms"
+        f"  p95 {latencies[int(len(latencies) * 0.95)]:8.2f} ms"
+    )
+print(f"BM25 stage alone: {bm25_ms():.2f} ms/query")
+print(f"Top {args.k} overlap with dense: {overlap:.3f}")
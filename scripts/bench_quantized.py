@@ -0,0 +1,75 @@
+# Memory, per-query latency and recall@k of int8 candidate scoring with
+# float rescoring, against exact float search over the same vectors.
+# Run from the repository root: PYTHONPATH=. python scripts/bench_quantized.py
+# (add --synthetic 200000 to benchmark without generated vectors)
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from quantization import QuantizedVectors
+from search_engine import SearchEngine
+from vector_store import VectorStore, normalize_rows
+
+SHORTLISTS = (2, 5, 10, 20, 50)
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--synthetic", type=int, help="use N random clustered papers")
+parser.add_argument("--queries", type=int, default=200)
+parser.add_argument("-k", type=int, default=10)
+args = parser.parse_args()
+
+rng = np.random.default_rng(0)
+if args.synthetic:
+    topics = rng.normal(size=(1000, 384))
+    topic = rng.integers(len(topics), size=args.synthetic)
+    title = topics[topic] + rng.normal(size=(args.synthetic, 384))
+    abstract = topics[topic] + rng.normal(size=(args.synthetic, 384))
+    fused = normalize_rows((title / 4 + abstract * 3 / 4).astype(np.float32))
+    index = pd.RangeIndex(args.synthetic)
+    store = VectorStore.from_arrays(
+        title=(index, title), abstract=(index, abstract), fused=(index, fused)
+    )
+    del title, abstract, fused
+else:
+    store = VectorStore.load("./generated", mmap_mode="r")
+
+start = time.perf_counter()
+quantized = {
+    field: QuantizedVectors.build(store.vectors[field]) for field in store.fields
+}
+print(f"{len(store):,} papers, quantization {time.perf_counter() - start:.1f} s")
+for field in store.fields:
+    print(
+        f"{field:>10}: float32 {store.vectors[field].nbytes / 2**20:8.1f} MiB"
+        f"  int8 {quantized[field].codes.nbytes / 2**20:8.1f} MiB"
+    )
+
+exact = SearchEngine(store, encode=None)
+
+# Queries are perturbed paper titles, so they land near real data
+queries = store.vectors["title"][rng.choice(len(store), args.queries)]
+queries = queries + rng.normal(scale=0.02, size=queries.shape).astype(np.float32)
+
+
+def run(engine, **options):
+    start = time.perf_counter()
+    results = [
+        engine.search_vector(query, k=args.k, **options).index for query in queries
+    ]
+    return results, (time.perf_counter() - start) / len(queries) * 1000
+
+
+for name, options in (("both", {}), ("title", {"abstract": False})):
+    truth, exact_ms = run(exact, **options)
+    print(f"{name}: exact {exact_ms:7.2f} ms/query")
+    for shortlist in SHORTLISTS:
+        approx = SearchEngine(
+            store, quantized=quantized, encode=None, quantized_shortlist=shortlist
+        )
+        results, ms = run(approx, **options)
+        recall = np.mean(
+            [len(r.intersection(t)) / args.k for r, t in zip(results, truth)]
+        )
+        print(
+            f"{f'int8 x{shortlist}':>12}: recall@{args.k} {recall:.3f}  {ms:7.2f} ms/query"
+        )
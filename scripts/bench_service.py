@@ -0,0 +1,53 @@
+# Throughput and latency of a running search service (scripts/serve_search.py)
+# under concurrent clients, and the mean size of the batches it formed.
+# Run from the repository root:
+#   PYTHONPATH=. python scripts/bench_service.py --clients 1 8 32
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from search_service import SearchClient
+
+WORDS = (
+    "learning neural network graph climate rice yield dark matter portfolio "
+    "vaccine speech recognition bayesian time series protein language model "
+    "robot control image segmentation quantum battery catalyst"
+).split()
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--url", default="http://127.0.0.1:8765")
+parser.add_argument("--clients", type=int, nargs="+", default=[1, 8, 32])
+parser.add_argument("--queries", type=int, default=400, help="per client count")
+parser.add_argument("--nprobe", type=int, default=0)
+args = parser.parse_args()
+
+client = SearchClient(args.url)
+rng = np.random.default_rng(0)
+# Distinct queries, so the service's query cache does not answer them
+queries = [" ".join(rng.choice(WORDS, 5)) + f" {i}" for i in range(args.queries)]
+
+
+def timed_search(query):
+    start = time.perf_counter()
+    client.search(query, nprobe=args.nprobe)
+    return (time.perf_counter() - start) * 1000
+
+
+for n_clients in args.clients:
+    before = client._request("GET", "/info")
+    with ThreadPoolExecutor(n_clients) as pool:
+        start = time.perf_counter()
+        latencies = sorted(
+            pool.map(timed_search, [f"{q} c{n_clients}" for q in queries])
+        )
+        elapsed = time.perf_counter() - start
+    after = client._request("GET", "/info")
+    batch_size = (after["queries"] - before["queries"]) / max(
+        after["batches"] - before["batches"], 1
+    )
+    print(
+        f"{n_clients:>3} clients: {len(queries) / elapsed:7.1f} queries/s"
+        f"  p50 {latencies[len(latencies) // 2]:7.1f} ms"
+        f"  p95 {latencies[int(len(latencies) * 0.95)]:7.1f} ms"
+        f"  mean batch {batch_size:5.1f}"
+    )
@@ -0,0 +1,16 @@
+# Builds the optional IVF indexes used by the search page, one per field.
+# Run after generate_vectors.py: PYTHONPATH=. python scripts/build_ann_index.py
+import numpy as np
+from ann import IVFIndex
+from artifacts import write_manifest
+from vector_store import VectorStore
+
+store = VectorStore.load("./generated", mmap_mode="r")
+
+for field in store.fields:
+    index = IVFIndex.build(store.vectors[field], np.flatnonzero(store.present[field]))
+    index.save("./generated", field)
+    print(f"{field.capitalize()} index done ({index.n_lists} lists)")
+
+write_manifest("./generated")
+print("Manifest done")
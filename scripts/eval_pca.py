@@ -0,0 +1,81 @@
+# Top-k overlap with full-dimension search, per-query latency and vector
+# memory of PCA-reduced search, to pick a size per deployment.
+# Run from the repository root: PYTHONPATH=. python scripts/eval_pca.py
+# (uses the pca* files of generate_vectors.py --pca in generated/ or
+# --directory; add --synthetic 200000 to fit projections on random papers)
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from projection import PCAProjection
+from search_engine import SearchEngine
+from vector_store import VectorStore, normalize_rows
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--directory", default="./generated")
+parser.add_argument("--synthetic", type=int, help="use N random clustered papers")
+parser.add_argument("--dimensions", type=int, nargs="+", default=[128, 64])
+parser.add_argument("--queries", type=int, default=200)
+parser.add_argument("-k", type=int, default=10)
+args = parser.parse_args()
+
+rng = np.random.default_rng(0)
+if args.synthetic:
+    topics = rng.normal(size=(1000, 384))
+    topic = rng.integers(len(topics), size=args.synthetic)
+    title = topics[topic] + rng.normal(size=(args.synthetic, 384))
+    abstract = topics[topic] + rng.normal(size=(args.synthetic, 384))
+    fused = normalize_rows((title / 4 + abstract * 3 / 4).astype(np.float32))
+    index = pd.RangeIndex(args.synthetic)
+    full = SearchEngine(
+        VectorStore.from_arrays(
+            title=(index, title), abstract=(index, abstract), fused=(index, fused)
+        ),
+        encode=None,
+    )
+    del title, abstract, fused
+    reduced = {}
+    for dimensions in args.dimensions:
+        projection = PCAProjection.fit(full.store, dimensions)
+        reduced[dimensions] = SearchEngine(
+            projection.transform_store(full.store), projection=projection, encode=None
+        )
+else:
+    full = SearchEngine.load(args.directory, quantized=False, encode=None)
+    reduced = {
+        dimensions: SearchEngine.load(
+            args.directory, dimensions=dimensions, encode=None
+        )
+        for dimensions in args.dimensions
+        if PCAProjection.exists(args.directory, dimensions)
+    }
+
+# Queries are perturbed paper titles, so they land near real data
+queries = full.store.vectors["title"][rng.choice(len(full.store), args.queries)]
+queries = queries + rng.normal(scale=0.02, size=queries.shape).astype(np.float32)
+
+
+def run(engine):
+    vectors = engine.project(queries)
+    start = time.perf_counter()
+    results = [engine.search_vector(vector, k=args.k).index for vector in vectors]
+    return results, (time.perf_counter() - start) / len(queries) * 1000
+
+
+def memory(engine):
+    return sum(matrix.nbytes for matrix in engine.store.vectors.values()) / 2**20
+
+
+truth, full_ms = run(full)
+print(f"{len(full.store):,} papers, {len(queries)} queries, top {args.k}")
+full_dimensions = f"{full.store.vectors['title'].shape[1]} (full)"
+print(
+    f"{full_dimensions:>11}: overlap 1.000  {full_ms:7.2f} ms/query  {memory(full):8.1f} MiB"
+)
+for dimensions, engine in reduced.items():
+    results, ms = run(engine)
+    overlap = np.mean([len(r.intersection(t)) / args.k for r, t in zip(results, truth)])
+    print(
+        f"{dimensions:>11}: overlap {overlap:.3f}  {ms:7.2f} ms/query"
+        f"  {memory(engine):8.1f} MiB"
+    )
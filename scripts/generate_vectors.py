@@ -1,53 +1,182 @@
+import argparse
 import pandas as pd
-from sbert import sbert
+import numpy as np
+import pyarrow as pa
+from sbert import sbert, load_model
+from scoring import top_k_similar
+from vector_store import VectorStore, normalize_rows
+from artifacts import write_manifest
+from filters import FilterIndex
+from bm25 import BM25Index
+from quantization import QuantizedVectors
+from projection import PCAProjection
+from similar_papers import SimilarPapers
+from encoding import encode_to_file
+from embedding_cache import EmbeddingCache
 from pathlib import Path
 
-# The file is not tracked on git
-df = pd.read_feather("./dataframes/papers-combined-ml.feather")
+TITLE_WEIGHT = 1 / 4
+ABSTRACT_WEIGHT = 3 / 4
+SIMILAR_PAPERS = 5
+EMBEDDING_CACHE = "./cache/embeddings"
+# Columns of the combined papers the search page can filter on; "field" may
+# hold a list (the subject areas of a Scopus paper)
+FILTER_COLUMNS = ["source", "year", "field"]
+WRITE_CHUNK = 65_536
 
-Path("generated").mkdir(exists_ok=True)
-title_vec = sbert.transform(df.title).add_prefix("title_v_")
-title_vec.to_feather("./generated/title_vec.feather")
-print("Title done")
-abstract_vec = sbert.transform(df.abstract).add_prefix("abstract_v_")
-abstract_vec.to_feather("./generated/abstract_vec.feather")
-print("Abstract done")
 
-title_vec = pd.read_feather("./generated/title_vec.feather")
-abstract_vec = pd.read_feather("./generated/abstract_vec.feather")
+def write_vectors_feather(vectors, index, prefix, path):
+    # Same layout as DataFrame.to_feather, written a record batch at a time
+    columns = [f"{prefix}{i}" for i in range(vectors.shape[1])]
+    schema = None
+    with pa.OSFile(path, "wb") as sink:
+        writer = None
+        for start in range(0, len(vectors), WRITE_CHUNK):
+            chunk = pd.DataFrame(
+                np.asarray(vectors[start : start + WRITE_CHUNK]),
+                index=index[start : start + WRITE_CHUNK],
+                columns=columns,
+            )
+            batch = pa.RecordBatch.from_pandas(
+                chunk, schema=schema, preserve_index=True
+            )
+            if writer is None:
+                schema = batch.schema
+                writer = pa.ipc.new_file(sink, schema)
+            writer.write_batch(batch)
+        if writer is not None:
+            writer.close()
 
-from sklearn.metrics.pairwise import cosine_similarity
-import numpy as np
 
-TITLE_WEIGHT = 1 / 4
-ABSTRACT_WEIGHT = 3 / 4
+def encode_field(texts, name, cache):
+    texts = texts.dropna()
+    vectors = encode_to_file(
+        texts,
+        sbert.model,
+        f"./generated/{name}_vec.npy",
+        batch_size=sbert.batch_size,
+        cache=cache,
+        label=name.capitalize(),
+    )
+    write_vectors_feather(
+        vectors,
+        texts.index.astype(np.int64),
+        f"{name}_v_",
+        f"./generated/{name}_vec.feather",
+    )
+    print(f"{name.capitalize()} done")
+    return vectors, texts.index
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--similar-papers",
+        type=int,
+        nargs="?",
+        const=SIMILAR_PAPERS,
+        default=0,
+        metavar="K",
+        help="also precompute K neighbours per paper, a warm cache for the page",
+    )
+    parser.add_argument(
+        "--quantize",
+        action="store_true",
+        help="also write int8 codes of the vectors for candidate scoring",
+    )
+    parser.add_argument(
+        "--pca",
+        type=int,
+        nargs="+",
+        default=[],
+        metavar="DIMENSIONS",
+        help="also write PCA-reduced vectors of these sizes, e.g. --pca 128 64",
+    )
+    args = parser.parse_args()
+
+    # The file is not tracked on git
+    df = pd.read_feather("./dataframes/papers-combined-ml.feather")
+
+    Path("generated").mkdir(exist_ok=True)
+    cache = EmbeddingCache(
+        EMBEDDING_CACHE,
+        sbert.model,
+        load_model(sbert.model).get_sentence_embedding_dimension(),
+    )
+
+    title_vec, title_index = encode_field(df.title, "title", cache)
+    abstract_vec, abstract_index = encode_field(df.abstract, "abstract", cache)
+
+    # Papers without an abstract fall back to their title vector alone. Sorted
+    # like the store's ids, which every row-aligned artifact below follows
+    index = title_index.union(abstract_index).sort_values()
+    vectors = np.zeros((len(index), title_vec.shape[1]), dtype=np.float32)
+    vectors[index.get_indexer(title_index)] += TITLE_WEIGHT * title_vec
+    vectors[index.get_indexer(abstract_index)] += ABSTRACT_WEIGHT * abstract_vec
+
+    # Published so the default (titles + abstracts) search needs one pass
+    normalize_rows(vectors)
+    np.save("./generated/fused_vec.npy", vectors)
+    write_vectors_feather(
+        vectors, index.astype(np.int64), "fused_v_", "./generated/fused_vec.feather"
+    )
+    print("Fused done")
+
+    # Normalized, memory-mappable copy the search page loads
+    store = VectorStore.from_arrays(
+        title=(title_index, title_vec),
+        abstract=(abstract_index, abstract_vec),
+        fused=(index, vectors),
+    )
+    assert np.array_equal(store.ids, index.to_numpy(dtype=np.int64))
+    store.save("./generated")
+    print("Vector store done")
+
+    # Optional int8 codes scanned by search in place of the float vectors
+    for field in store.fields:
+        if args.quantize:
+            QuantizedVectors.build(store.vectors[field]).save("./generated", field)
+        else:
+            QuantizedVectors.remove("./generated", field)
+
+    # Optional reduced variants, selected with SearchEngine.load(dimensions=)
+    for path in Path("./generated").glob("pca*.npy"):
+        path.unlink()
+    for dimensions in args.pca:
+        projection = PCAProjection.fit(store, dimensions)
+        projection.save("./generated")
+        projection.transform_store(store).save("./generated", prefix=projection.prefix)
+        print(f"PCA to {dimensions} dimensions done")
+    del store
+
+    # Bitmaps over the store rows, so filtered searches only score matches
+    papers = df.loc[index]
+    if "year" in papers:
+        papers = papers.assign(year=papers["year"].astype("Int64"))
+    columns = {column: papers[column] for column in FILTER_COLUMNS if column in papers}
+    if columns:
+        FilterIndex.build(**columns).save("./generated")
+        print(f"Filters done ({', '.join(columns)})")
+
+    # Keyword index for hybrid search, over the same rows and texts
+    BM25Index.build(
+        (papers["title"].fillna("") + " " + papers["abstract"].fillna("")).tolist()
+    ).save("./generated")
+    print("BM25 index done")
+
+    # Optional: the page computes neighbours live. Chunked over row blocks
+    # and a process pool; never builds the N x N matrix
+    if args.similar_papers:
+        similar_positions, similarity = top_k_similar(vectors, args.similar_papers)
+        SimilarPapers.build(index, similar_positions, similarity).save("./generated")
+        print("Similar papers done")
+    else:
+        # Stale files from an earlier run must not ship with the new vectors
+        SimilarPapers.remove("./generated")
+
+    manifest = write_manifest("./generated")
+    print(f"Manifest for version {manifest['version']} done")
+
 
-vectors = (
-    title_vec.rename(columns=lambda x: x.removeprefix("title_")) * TITLE_WEIGHT
-    + abstract_vec.rename(columns=lambda x: x.removeprefix("abstract_"))
-    * ABSTRACT_WEIGHT
-)
-# similarity_mtx = pd.DataFrame(
-#     cosine_similarity(vectors).astype(np.float16, copy=False),
-#     index=vectors.index,
-#     columns=vectors.index,
-# )
-sim = cosine_similarity(vectors)
-
-top_5_arg = np.argpartition(sim, -6)[:, -6:]
-top_5_data = np.take_along_axis(sim, top_5_arg, axis=1)
-
-top_5_arg_argsorted = (-top_5_data).argsort()[:, 1:]
-top_5_arg_sorted = np.take_along_axis(top_5_arg, top_5_arg_argsorted, axis=1)
-top_5_data_sorted = np.take_along_axis(top_5_data, top_5_arg_argsorted, axis=1)
-
-similar_indices = pd.Series(top_5_arg_sorted.tolist(), index=vectors.index).rename(
-    "similar_indices"
-)
-similarity = pd.Series(top_5_data_sorted.tolist(), index=vectors.index).rename(
-    "similarity"
-)
-pd.DataFrame([similar_indices, similarity]).transpose().to_feather(
-    "./generated/similar_papers.feather"
-)
-print("Similarity matrix done")
+if __name__ == "__main__":
+    main()
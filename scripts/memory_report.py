@@ -0,0 +1,75 @@
+# Per-worker memory when N processes each load the vector store, either as a
+# private copy (the old behaviour) or memory mapped from the shared files.
+# Linux only (reads /proc/<pid>/smaps_rollup).
+# Run from the repository root: PYTHONPATH=. python scripts/memory_report.py
+import argparse
+import multiprocessing
+import numpy as np
+from vector_store import VectorStore
+
+MB = 1024
+
+
+def smaps_rollup():
+    fields = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            name, _, value = line.partition(":")
+            if value.strip().endswith("kB"):
+                fields[name] = int(value.split()[0])
+    return fields
+
+
+def worker(directory, mmap_mode, ready, done):
+    store = VectorStore.load(directory, mmap_mode=mmap_mode)
+    # Touch every row, like a brute-force query does
+    query = np.ones(store.vectors[store.fields[0]].shape[1], dtype=np.float32)
+    for field in store.fields:
+        store.score(field, query)
+
+    ready.put(smaps_rollup())
+    done.wait()
+
+
+def report(directory, workers, mmap_mode):
+    done = multiprocessing.Event()
+    ready = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(target=worker, args=(directory, mmap_mode, ready, done))
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    # Sample while all workers are alive, so shared pages are split between them
+    usage = [ready.get() for _ in processes]
+    done.set()
+    for process in processes:
+        process.join()
+
+    rss = [u["Rss"] for u in usage]
+    pss = [u["Pss"] for u in usage]
+    private = [u["Private_Clean"] + u["Private_Dirty"] for u in usage]
+    label = "private copy" if mmap_mode is None else "memory mapped"
+    print(f"{label} ({workers} workers)")
+    print(
+        f"  per worker: RSS {np.mean(rss) / MB:8.1f} MB  "
+        f"PSS {np.mean(pss) / MB:8.1f} MB  private {np.mean(private) / MB:8.1f} MB"
+    )
+    print(f"  all workers (PSS sum): {sum(pss) / MB:8.1f} MB")
+    return sum(pss)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("directory", nargs="?", default="./generated")
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    multiprocessing.set_start_method("spawn")
+    copied = report(args.directory, args.workers, None)
+    mapped = report(args.directory, args.workers, "r")
+    saved = copied - mapped
+    print(
+        f"Saving: {saved / MB:.1f} MB total, "
+        f"{saved / args.workers / MB:.1f} MB per worker"
+    )
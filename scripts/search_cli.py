@@ -0,0 +1,70 @@
+# Runs many searches without Streamlit: one query per line in, one JSON line
+# per query out.
+# Run from the repository root:
+#   PYTHONPATH=. python scripts/search_cli.py queries.txt -o results.jsonl
+import argparse
+import json
+import sys
+import time
+from artifacts import ArtifactCache
+from search_engine import SearchEngine
+from search_results import to_records
+
+parser = argparse.ArgumentParser()
+parser.add_argument("queries", help="text file with one query per line, - for stdin")
+parser.add_argument("-o", "--output", default="-", help="JSONL output, - for stdout")
+parser.add_argument("-k", type=int, default=5)
+parser.add_argument("--min-score", type=float)
+parser.add_argument("--no-title", action="store_true")
+parser.add_argument("--no-abstract", action="store_true")
+parser.add_argument(
+    "--hybrid", action="store_true", help="rerank a BM25 shortlist per query"
+)
+parser.add_argument("--batch-size", type=int, default=1024, help="queries per batch")
+source = parser.add_mutually_exclusive_group()
+source.add_argument("--directory", default="./generated", help="generated files")
+source.add_argument("--releases-url", help="use the release at this url instead")
+args = parser.parse_args()
+
+if args.releases_url:
+    directory = ArtifactCache(args.releases_url).sync()
+else:
+    directory = args.directory
+engine = SearchEngine.load(directory)
+
+with open(args.queries) if args.queries != "-" else sys.stdin as f:
+    queries = [line.rstrip("\n") for line in f]
+
+started = time.perf_counter()
+with open(args.output, "w") if args.output != "-" else sys.stdout as out:
+    for start in range(0, len(queries), args.batch_size):
+        batch = queries[start : start + args.batch_size]
+        options = dict(
+            title=not args.no_title,
+            abstract=not args.no_abstract,
+            k=args.k,
+            min_score=args.min_score,
+        )
+        if args.hybrid:
+            # Each query has its own shortlist; only the encoding is batched
+            non_empty = [query for query in batch if query.strip()]
+            vectors = iter(engine.vectorize_many(non_empty) if non_empty else [])
+            results = [
+                (
+                    engine.search_vector(next(vectors), lexical_query=query, **options)
+                    if query.strip()
+                    else engine.search(query, **options)
+                )
+                for query in batch
+            ]
+        else:
+            results = engine.search_many(batch, **options)
+        for query, result in zip(batch, results):
+            record = {"query": query, "results": to_records(result)}
+            out.write(json.dumps(record) + "\n")
+
+elapsed = time.perf_counter() - started
+print(
+    f"{len(queries):,} queries in {elapsed:.1f} s ({len(queries) / elapsed:,.0f}/s)",
+    file=sys.stderr,
+)
@@ -0,0 +1,57 @@
+# Runs the search service the search page talks to when SEARCH_SERVICE_URL
+# is set: one process owns the model and vectors and batches the queries of
+# every page session.
+# Run from the repository root:
+#   PYTHONPATH=. python scripts/serve_search.py --releases-url <RELEASES_URL>
+import argparse
+import asyncio
+import logging
+from artifacts import ArtifactCache
+from query_cache import QueryEmbeddingCache
+from sbert import sbert
+from search_engine import SearchEngine, encode_with_sbert
+from search_service import MAX_BATCH, MAX_WAIT, SearchService
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--host", default="127.0.0.1")
+parser.add_argument("--port", type=int, default=8765)
+parser.add_argument("--max-batch", type=int, default=MAX_BATCH)
+parser.add_argument(
+    "--max-wait-ms",
+    type=float,
+    default=MAX_WAIT * 1000,
+    help="how long the first query of a batch waits for others",
+)
+parser.add_argument("--query-cache-size", type=int, default=4096)
+parser.add_argument("--query-cache-dir")
+parser.add_argument("--dimensions", type=int, help="search PCA-reduced vectors")
+parser.add_argument(
+    "--no-quantized",
+    action="store_true",
+    help="score the float vectors only, even if the release has int8 codes",
+)
+source = parser.add_mutually_exclusive_group()
+source.add_argument("--directory", default="./generated", help="generated files")
+source.add_argument("--releases-url", help="use the release at this url instead")
+args = parser.parse_args()
+
+if args.releases_url:
+    directory = ArtifactCache(args.releases_url).sync()
+else:
+    directory = args.directory
+
+logging.basicConfig(level=logging.INFO)
+sbert.warm()
+engine = SearchEngine.load(
+    directory,
+    quantized=not args.no_quantized,
+    dimensions=args.dimensions,
+    query_cache=QueryEmbeddingCache(
+        encode_with_sbert,
+        maxsize=args.query_cache_size,
+        path=args.query_cache_dir,
+        model_name=sbert.model,
+    ),
+)
+service = SearchService(engine, args.max_batch, args.max_wait_ms / 1000)
+asyncio.run(service.serve(args.host, args.port))
@@ -0,0 +1,380 @@
+import numpy as np
+import pandas as pd
+from ann import IVFIndex
+from bm25 import BM25Index
+from filters import FilterIndex
+from projection import PCAProjection
+from quantization import QuantizedVectors
+from sbert import sbert
+from search_results import SIMILARITY_COLUMNS
+from similar_papers import SimilarPapers
+from scoring import weighted_mean, top_k
+from vector_store import VectorStore
+
+TITLE_WEIGHT = 1 / 4
+ABSTRACT_WEIGHT = 3 / 4
+# Candidates per result taken from the fused matrix before exact rescoring
+FUSED_SHORTLIST = 4
+# Candidates per result taken from int8 codes before float rescoring
+QUANTIZED_SHORTLIST = 10
+# Rows kept from the BM25 stage for dense reranking in hybrid mode
+BM25_SHORTLIST = 1000
+# Upper bound on the (papers x queries) score block search_many holds at once
+MAX_SCORE_BLOCK = 64 * 1024 * 1024
+
+
+def encode_with_sbert(texts):
+    return sbert.transform(list(texts))
+
+
+class SearchEngine:
+    def __init__(
+        self,
+        store,
+        ann_indexes=None,
+        filters=None,
+        bm25=None,
+        similar_papers=None,
+        quantized=None,
+        projection=None,
+        encode=encode_with_sbert,
+        query_cache=None,
+        quantized_shortlist=QUANTIZED_SHORTLIST,
+    ):
+        self.store = store
+        self.ann_indexes = ann_indexes or {}
+        self.filters = filters
+        self.bm25 = bm25
+        # Optional precomputed neighbours (generate_vectors --similar-papers),
+        # only a warm cache for similar()
+        self.similar_papers = similar_papers
+        # field -> QuantizedVectors scanned instead of the float vectors
+        self.quantized = quantized or {}
+        # Candidates per result taken from the int8 codes
+        self.quantized_shortlist = quantized_shortlist
+        # PCAProjection of queries when the store holds reduced vectors
+        self.projection = projection
+        self.encode = encode
+        self.query_cache = query_cache
+
+    @classmethod
+    def load(cls, directory, mmap_mode="r", quantized=True, dimensions=None, **kwargs):
+        # dimensions: search the PCA-reduced vectors of that size instead
+        projection = None
+        if dimensions:
+            projection = PCAProjection.load(directory, dimensions)
+            store = VectorStore.load(
+                directory, mmap_mode=mmap_mode, prefix=projection.prefix
+            )
+        else:
+            store = VectorStore.load(directory, mmap_mode=mmap_mode)
+
+        # ANN indexes and int8 codes are built from the full vectors
+        ann_indexes = {
+            field: IVFIndex.load(directory, field, mmap_mode=mmap_mode)
+            for field in store.fields
+            if projection is None and IVFIndex.exists(directory, field)
+        }
+        filters = None
+        if FilterIndex.exists(directory):
+            filters = FilterIndex.load(directory, mmap_mode=mmap_mode)
+        bm25 = None
+        if BM25Index.exists(directory):
+            bm25 = BM25Index.load(directory, mmap_mode=mmap_mode)
+        similar_papers = None
+        if SimilarPapers.exists(directory):
+            similar_papers = SimilarPapers.load(directory, mmap_mode=mmap_mode)
+        quantized = {
+            field: QuantizedVectors.load(directory, field, mmap_mode=mmap_mode)
+            for field in store.fields
+            if quantized
+            and projection is None
+            and QuantizedVectors.exists(directory, field)
+        }
+        return cls(
+            store,
+            ann_indexes,
+            filters,
+            bm25,
+            similar_papers,
+            quantized,
+            projection,
+            **kwargs,
+        )
+
+    def vectorize_many(self, texts):
+        if self.query_cache is not None:
+            vectors = self.query_cache.get_many(texts)
+        else:
+            vectors = np.array(self.encode(list(texts)), dtype=np.float32, ndmin=2)
+        return self.project(vectors)
+
+    def project(self, vectors):
+        # Full-size embeddings into the space of the store's vectors
+        if self.projection is None:
+            return vectors
+        return self.projection.transform(vectors)
+
+    def vectorize(self, text):
+        return self.vectorize_many([text])[0]
+
+    @property
+    def filter_labels(self):
+        # column -> values a search can be filtered on
+        return self.filters.labels if self.filters is not None else {}
+
+    def filter_rows(self, filters):
+        # filters: column -> allowed values, e.g. {"source": ["arxiv"],
+        # "year": range(2020, 2024)}; None when nothing restricts the rows
+        if not filters or self.filters is None:
+            return None
+        return self.filters.rows(**filters)
+
+    def search(
+        self,
+        query,
+        title=True,
+        abstract=True,
+        k=5,
+        min_score=None,
+        nprobe=0,
+        filters=None,
+        hybrid=False,
+    ):
+        query = query.strip()
+        if len(query) == 0:
+            return pd.DataFrame(columns=SIMILARITY_COLUMNS)
+
+        return self.search_vector(
+            self.vectorize(query),
+            title,
+            abstract,
+            k,
+            min_score,
+            nprobe,
+            filters,
+            lexical_query=query if hybrid else None,
+        )
+
+    def search_vector(
+        self,
+        query_vector,
+        title=True,
+        abstract=True,
+        k=5,
+        min_score=None,
+        nprobe=0,
+        filters=None,
+        lexical_query=None,
+    ):
+        fields = [f for f, on in (("title", title), ("abstract", abstract)) if on]
+        if title and abstract:
+            fields = ["fused"]
+
+        # Filtered out rows are never scored
+        rows = self.filter_rows(filters)
+
+        # Hybrid: only the BM25 shortlist is dense scored; a query matching no
+        # indexed term falls through to the full dense search
+        shortlisted = False
+        if lexical_query and self.bm25 is not None:
+            hits = self.bm25.top_rows(lexical_query, BM25_SHORTLIST, within=rows)
+            if len(hits):
+                rows = hits
+                shortlisted = True
+
+        if (
+            not shortlisted
+            and nprobe
+            and fields
+            and all(field in self.ann_indexes for field in fields)
+        ):
+            rows = self._ann_rows(query_vector, fields, nprobe, rows)
+
+        # Scan the int8 codes instead of the float vectors: only their best
+        # candidates are read from the (memory mapped) float vectors below
+        field = fields[0] if len(fields) == 1 else None
+        shortlist = k * self.quantized_shortlist
+        if field in self.quantized and (rows is None or len(rows) > shortlist):
+            present = self.store.present[field]
+            scores = self.quantized[field].score(query_vector, rows)
+            scores[~(present if rows is None else present[rows])] = np.nan
+            top = top_k(scores, shortlist)
+            rows = top if rows is None else rows[top]
+
+        # Titles + abstracts: one pass over the precomputed weighted
+        # title/abstract matrix shortlists candidates; per-field scores are
+        # computed for those only
+        if fields == ["fused"]:
+            shortlist = top_k(
+                self.store.score("fused", query_vector, rows), k * FUSED_SHORTLIST
+            )
+            rows = shortlist if rows is None else rows[shortlist]
+
+        return self._rescore(query_vector, rows, title, abstract, k, min_score)
+
+    def search_many(
+        self, queries, title=True, abstract=True, k=5, min_score=None, filters=None
+    ):
+        # Exact search for many queries: one encoder batch, then one
+        # matrix-matrix product per block of queries
+        results = [pd.DataFrame(columns=SIMILARITY_COLUMNS) for _ in queries]
+        non_empty = [i for i, query in enumerate(queries) if query.strip()]
+        if not non_empty or not (title or abstract):
+            return results
+
+        vectors = self.vectorize_many([queries[i] for i in non_empty])
+        found = self.search_many_vectors(
+            vectors, title, abstract, k, min_score, filters
+        )
+        for i, result in zip(non_empty, found):
+            results[i] = result
+        return results
+
+    def search_many_vectors(
+        self,
+        query_vectors,
+        title=True,
+        abstract=True,
+        k=5,
+        min_score=None,
+        filters=None,
+        nprobe=0,
+    ):
+        # search_many for already encoded queries. With nprobe (and an IVF
+        # index for the field) or int8 codes, each query is only ranked among
+        # its own candidates, scored by one product over the union of them.
+        if not (title or abstract):
+            return [pd.DataFrame(columns=SIMILARITY_COLUMNS) for _ in query_vectors]
+        field = "fused" if title and abstract else "title" if title else "abstract"
+        shortlist = k * FUSED_SHORTLIST if field == "fused" else k
+
+        rows = self.filter_rows(filters)
+        candidates = None
+        if nprobe and field in self.ann_indexes:
+            candidates = [
+                self._ann_rows(query_vector, [field], nprobe, rows)
+                for query_vector in query_vectors
+            ]
+        if field in self.quantized:
+            candidates = self._quantized_rows(
+                field, query_vectors, rows, candidates, k * self.quantized_shortlist
+            )
+        if candidates is not None:
+            rows = np.unique(np.concatenate(candidates))
+        n_rows = len(self.store) if rows is None else len(rows)
+
+        results = []
+        step = max(1, MAX_SCORE_BLOCK // max(n_rows, 1))
+        for start in range(0, len(query_vectors), step):
+            block = query_vectors[start : start + step]
+            scores = self.store.score_many(field, block, rows)
+            for j, query_vector in enumerate(block):
+                query_scores, query_rows = scores[:, j], rows
+                if candidates is not None:
+                    query_rows = candidates[start + j]
+                    query_scores = query_scores[np.searchsorted(rows, query_rows)]
+                top = top_k(query_scores, shortlist)
+                results.append(
+                    self._rescore(
+                        query_vector,
+                        top if query_rows is None else query_rows[top],
+                        title,
+                        abstract,
+                        k,
+                        min_score,
+                    )
+                )
+        return results
+
+    def similar(self, paper, k=5, exclude_self=True, nprobe=0):
+        # Papers nearest to one paper (by combined_minimal index), scored on
+        # the fused title/abstract vectors, best first
+        cached = None
+        if self.similar_papers is not None and exclude_self:
+            cached = self.similar_papers.get(paper, k)
+        if cached is not None:
+            ids, scores = cached
+            return pd.DataFrame(
+                {"overall_similarity": scores}, index=pd.Index(ids, name="index")
+            )
+
+        row = self.store.rows([paper])[0]
+        query_vector = self.store.vectors["fused"][row]
+        rows = None
+        if nprobe and "fused" in self.ann_indexes:
+            rows = np.union1d(
+                self.ann_indexes["fused"].candidates(query_vector, nprobe), [row]
+            )
+
+        scores = self.store.score("fused", query_vector, rows)
+        if exclude_self:
+            scores[row if rows is None else np.searchsorted(rows, row)] = np.nan
+
+        top = top_k(scores, k)
+        return pd.DataFrame(
+            {"overall_similarity": scores[top]},
+            index=self.store.index[top if rows is None else rows[top]],
+        )
+
+    def _ann_rows(self, query_vector, fields, nprobe, rows):
+        # Sorted IVF candidates of the query in any of `fields`, within rows
+        candidates = np.unique(
+            np.concatenate(
+                [
+                    self.ann_indexes[field].candidates(query_vector, nprobe)
+                    for field in fields
+                ]
+            )
+        )
+        if rows is None:
+            return candidates
+        return np.intersect1d(rows, candidates, assume_unique=True)
+
+    def _quantized_rows(self, field, query_vectors, rows, candidates, shortlist):
+        # Each query's best `shortlist` rows by int8 score, among its own
+        # candidates or else among `rows` (None: keep them all). Without
+        # per-query candidates one scan of the codes serves a block of queries.
+        present = self.store.present[field]
+        if candidates is not None:
+            found = []
+            for query_vector, query_rows in zip(query_vectors, candidates):
+                if len(query_rows) > shortlist:
+                    scores = self.quantized[field].score(query_vector, query_rows)
+                    scores[~present[query_rows]] = np.nan
+                    query_rows = query_rows[top_k(scores, shortlist)]
+                found.append(query_rows)
+            return found
+        if rows is not None and len(rows) <= shortlist:
+            return None
+
+        n_rows = len(self.store) if rows is None else len(rows)
+        step = max(1, MAX_SCORE_BLOCK // max(n_rows, 1))
+        found = []
+        for start in range(0, len(query_vectors), step):
+            block = query_vectors[start : start + step]
+            scores = self.quantized[field].score_many(block, rows)
+            scores[~(present if rows is None else present[rows])] = np.nan
+            for j in range(len(block)):
+                top = top_k(scores[:, j], shortlist)
+                found.append(top if rows is None else rows[top])
+        return found
+
+    def _rescore(self, query_vector, rows, title, abstract, k, min_score):
+        scores = np.full((len(self.store) if rows is None else len(rows), 2), np.nan)
+        if title:
+            scores[:, 0] = self.store.score("title", query_vector, rows)
+        if abstract:
+            scores[:, 1] = self.store.score("abstract", query_vector, rows)
+        overall = weighted_mean(scores, (TITLE_WEIGHT, ABSTRACT_WEIGHT))
+
+        # Only the top k (not a score per paper) is returned
+        top = top_k(overall, k, min_score)
+        return pd.DataFrame(
+            {
+                "title_similarity": scores[top, 0],
+                "abstract_similarity": scores[top, 1],
+                "overall_similarity": overall[top],
+            },
+            index=self.store.index[top if rows is None else rows[top]],
+        )
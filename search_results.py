@@ -0,0 +1,37 @@
+import math
+import numpy as np
+import pandas as pd
+
+# Shared by the search engine and its HTTP service/client; kept free of the
+# model and vector dependencies so a client can import it alone
+SIMILARITY_COLUMNS = ["title_similarity", "abstract_similarity", "overall_similarity"]
+
+
+def to_records(result):
+    return [
+        {"index": int(index)}
+        | {
+            column: None if math.isnan(value) else float(value)
+            for column, value in row.items()
+        }
+        for index, row in result.iterrows()
+    ]
+
+
+def from_records(records, columns=SIMILARITY_COLUMNS):
+    frame = pd.DataFrame.from_records(records, columns=["index", *columns])
+    return frame.set_index("index").astype(np.float64)
+
+
+def fetch_paper_details(conn, similarity):
+    # Joins search results (indexed by combined_minimal index) to their papers
+    return (
+        pd.read_sql_query(
+            "SELECT * FROM combined_minimal WHERE index = ANY(%s)",
+            params=(similarity.index.to_list(),),
+            con=conn,
+        )
+        .set_index("index")
+        .join(similarity)
+        .sort_values("overall_similarity", ascending=False)
+    )
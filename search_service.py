@@ -0,0 +1,308 @@
+import asyncio
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property, partial
+from http import HTTPStatus
+import numpy as np
+import pandas as pd
+import requests
+from search_results import SIMILARITY_COLUMNS, from_records, to_records
+
+logger = logging.getLogger(__name__)
+
+# Longest the first query of a batch waits for others to join it
+MAX_WAIT = 0.005
+MAX_BATCH = 64
+
+SEARCH_DEFAULTS = {
+    "title": True,
+    "abstract": True,
+    "k": 5,
+    "min_score": None,
+    "nprobe": 0,
+    "filters": None,
+    "hybrid": False,
+}
+# Searches with equal values here (and nprobe) share one matrix product in a
+# batch
+BATCH_KEY = ("title", "abstract", "k", "min_score", "filters")
+
+
+def parse_search(request):
+    # A /search body: {"query": ..., **options}, unknown options rejected
+    if not isinstance(request.get("query"), str):
+        raise ValueError("query must be a string")
+    unknown = set(request) - set(SEARCH_DEFAULTS) - {"query"}
+    if unknown:
+        raise ValueError(f"unknown options: {', '.join(sorted(unknown))}")
+    return SEARCH_DEFAULTS | request
+
+
+def run_batch(engine, requests):
+    # One encoder call for the whole batch. Searches with the same options
+    # (and, for ANN searches, the same nprobe) are scored with one matrix
+    # product; hybrid searches have per-query BM25 shortlists and run one by
+    # one on their vectors.
+    results = [pd.DataFrame(columns=SIMILARITY_COLUMNS) for _ in requests]
+    queries = [request["query"].strip() for request in requests]
+    non_empty = [i for i, query in enumerate(queries) if query]
+    if not non_empty:
+        return results
+    vectors = engine.vectorize_many([queries[i] for i in non_empty])
+    vectors = dict(zip(non_empty, vectors))
+
+    groups = {}
+    for i in non_empty:
+        request = requests[i]
+        if request["hybrid"]:
+            results[i] = engine.search_vector(
+                vectors[i],
+                nprobe=request["nprobe"],
+                lexical_query=queries[i],
+                **{name: request[name] for name in BATCH_KEY},
+            )
+        else:
+            nprobe = request["nprobe"] if engine.ann_indexes else 0
+            key = json.dumps(
+                [request[name] for name in BATCH_KEY] + [nprobe], sort_keys=True
+            )
+            groups.setdefault(key, []).append(i)
+
+    for members in groups.values():
+        request = requests[members[0]]
+        found = engine.search_many_vectors(
+            np.stack([vectors[i] for i in members]),
+            nprobe=request["nprobe"] if engine.ann_indexes else 0,
+            **{name: request[name] for name in BATCH_KEY},
+        )
+        for i, result in zip(members, found):
+            results[i] = result
+    return results
+
+
+class SearchService:
+    # Owns one SearchEngine and serves it over local HTTP (JSON bodies):
+    #   GET /info      papers, filter labels and batching counters
+    #   POST /search   {"query": ..., **SEARCH_DEFAULTS} -> {"results": [...]}
+    #   POST /similar  {"paper": ..., "k": 5, "exclude_self": true, "nprobe": 0}
+    # Concurrent searches are queued and run as micro-batches: a batch
+    # starts with the first waiting query and takes whatever else arrives
+    # within max_wait seconds, up to max_batch queries.
+    def __init__(self, engine, max_batch=MAX_BATCH, max_wait=MAX_WAIT):
+        self.engine = engine
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        # A single engine thread: batches run one after another, and the
+        # event loop keeps accepting queries for the next one meanwhile
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.queue = None
+        self.batches = 0
+        self.queries = 0
+
+    async def serve(self, host="127.0.0.1", port=8765):
+        self.queue = asyncio.Queue()
+        batcher = asyncio.create_task(self._run_batches())
+        server = await asyncio.start_server(self._handle, host, port)
+        print(f"Serving on http://{host}:{port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batcher.cancel()
+
+    async def search(self, request):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((request, future))
+        return await future
+
+    async def similar(self, paper, k=5, exclude_self=True, nprobe=0):
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor,
+            partial(self.engine.similar, paper, k, exclude_self, nprobe),
+        )
+
+    def info(self):
+        return {
+            "papers": len(self.engine.store),
+            "filters": self.engine.filter_labels,
+            "batches": self.batches,
+            "queries": self.queries,
+        }
+
+    async def _run_batches(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                if not self.queue.empty():
+                    batch.append(self.queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except TimeoutError:
+                    break
+
+            requests = [request for request, _ in batch]
+            try:
+                results = await loop.run_in_executor(
+                    self.executor, run_batch, self.engine, requests
+                )
+            except Exception:
+                # One bad request must not fail the others: rerun them alone
+                results = []
+                for request in requests:
+                    try:
+                        results += await loop.run_in_executor(
+                            self.executor, run_batch, self.engine, [request]
+                        )
+                    except Exception as error:
+                        results.append(error)
+
+            self.batches += 1
+            self.queries += len(batch)
+            for (_, future), result in zip(batch, results):
+                # The client may have gone away meanwhile
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    async def _route(self, method, path, body):
+        try:
+            if method == "GET" and path == "/info":
+                return HTTPStatus.OK, self.info()
+            if method == "POST" and path == "/search":
+                result = await self.search(parse_search(json.loads(body)))
+                return HTTPStatus.OK, {"results": to_records(result)}
+            if method == "POST" and path == "/similar":
+                request = json.loads(body)
+                options = (
+                    int(request["paper"]),
+                    int(request.get("k", 5)),
+                    bool(request.get("exclude_self", True)),
+                    int(request.get("nprobe", 0)),
+                )
+                try:
+                    result = await self.similar(*options)
+                except KeyError:
+                    return HTTPStatus.NOT_FOUND, {"error": "unknown paper"}
+                return HTTPStatus.OK, {"results": to_records(result)}
+            return HTTPStatus.NOT_FOUND, {"error": f"no route for {method} {path}"}
+        except (KeyError, ValueError, TypeError) as error:
+            return HTTPStatus.BAD_REQUEST, {"error": str(error)}
+        except Exception as error:
+            # Anything else the engine raised: answer, keeping the connection
+            logger.exception("%s %s failed", method, path)
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(error)}
+
+    async def _handle(self, reader, writer):
+        # Minimal HTTP/1.1 with keep-alive, enough for SearchClient
+        try:
+            while request_line := await reader.readline():
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+                status, payload = await self._route(method, path, body)
+                data = json.dumps(payload).encode()
+                writer.write(
+                    f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                    "Content-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n\r\n".encode() + data
+                )
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+class SearchClient:
+    # The search, similar and filter_labels of a SearchEngine, answered by a
+    # SearchService at `url`, so the page needs neither model nor vectors
+    def __init__(self, url, timeout=30):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        self._local = threading.local()
+
+    @property
+    def session(self):
+        # Keep-alive connection per thread (Streamlit runs sessions in threads)
+        if not hasattr(self._local, "session"):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def _request(self, method, path, payload=None):
+        response = self.session.request(
+            method, self.url + path, json=payload, timeout=self.timeout
+        )
+        response.raise_for_status()
+        return response.json()
+
+    @cached_property
+    def filter_labels(self):
+        return self._request("GET", "/info")["filters"]
+
+    def search(
+        self,
+        query,
+        title=True,
+        abstract=True,
+        k=5,
+        min_score=None,
+        nprobe=0,
+        filters=None,
+        hybrid=False,
+    ):
+        if len(query.strip()) == 0:
+            return pd.DataFrame(columns=SIMILARITY_COLUMNS)
+        filters = {
+            column: None if values is None else list(values)
+            for column, values in (filters or {}).items()
+        }
+        response = self._request(
+            "POST",
+            "/search",
+            {
+                "query": query,
+                "title": title,
+                "abstract": abstract,
+                "k": k,
+                "min_score": min_score,
+                "nprobe": nprobe,
+                "filters": filters or None,
+                "hybrid": hybrid,
+            },
+        )
+        return from_records(response["results"])
+
+    def similar(self, paper, k=5, exclude_self=True, nprobe=0):
+        try:
+            response = self._request(
+                "POST",
+                "/similar",
+                {
+                    "paper": int(paper),
+                    "k": k,
+                    "exclude_self": exclude_self,
+                    "nprobe": nprobe,
+                },
+            )
+        except requests.HTTPError as error:
+            if error.response.status_code == HTTPStatus.NOT_FOUND:
+                raise KeyError(paper) from error
+            raise
+        return from_records(response["results"], ["overall_similarity"])
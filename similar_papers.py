@@ -0,0 +1,58 @@
+from pathlib import Path
+import numpy as np
+
+
+class SimilarPapers:
+    # Precomputed neighbours as fixed-width arrays: row i holds the k nearest
+    # papers of ids[i] as positions into ids (int32) with their similarities
+    # (float16), best first. Lookups are a binary search on the sorted ids
+    # plus a slice, so the files can be memory mapped as they are.
+    def __init__(self, ids, rows, scores):
+        self.ids = ids
+        self.rows = rows
+        self.scores = scores
+
+    @classmethod
+    def build(cls, ids, positions, scores):
+        return cls(
+            np.asarray(ids, dtype=np.int64),
+            np.asarray(positions, dtype=np.int32),
+            np.asarray(scores, dtype=np.float16),
+        )
+
+    @classmethod
+    def load(cls, directory, mmap_mode=None):
+        directory = Path(directory)
+        return cls(
+            *(
+                np.asarray(
+                    np.load(directory / f"similar.{name}.npy", mmap_mode=mmap_mode)
+                )
+                for name in ("ids", "rows", "scores")
+            )
+        )
+
+    @staticmethod
+    def exists(directory):
+        return (Path(directory) / "similar.ids.npy").exists()
+
+    @staticmethod
+    def remove(directory):
+        for name in ("ids", "rows", "scores"):
+            (Path(directory) / f"similar.{name}.npy").unlink(missing_ok=True)
+
+    def save(self, directory):
+        directory = Path(directory)
+        for name in ("ids", "rows", "scores"):
+            np.save(directory / f"similar.{name}.npy", getattr(self, name))
+
+    @property
+    def k(self):
+        return self.rows.shape[1]
+
+    def get(self, paper, k):
+        # (ids, scores) of the k nearest papers, or None when not cached
+        row = np.searchsorted(self.ids, paper)
+        if k > self.k or row == len(self.ids) or self.ids[row] != paper:
+            return None
+        return self.ids[self.rows[row, :k]], self.scores[row, :k].astype(np.float32)
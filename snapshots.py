@@ -0,0 +1,74 @@
+import os
+import tempfile
+from pathlib import Path
+import pandas as pd
+import pyarrow as pa
+import sqlalchemy
+from artifacts import DEFAULT_ROOT
+
+DEFAULT_DIRECTORY = DEFAULT_ROOT / "snapshots"
+# Written by DataFrame.to_sql along with the tables; grows with every insert
+ID_COLUMN = "index"
+VERSION_KEY = b"snapshot_version"
+
+
+def fingerprint(conn, table):
+    # Cheap change check: row count and largest id, from the table's index
+    count, max_id = conn.execute(
+        sqlalchemy.select(
+            sqlalchemy.func.count(), sqlalchemy.func.max(sqlalchemy.column(ID_COLUMN))
+        ).select_from(sqlalchemy.table(table))
+    ).one()
+    return f"{count}:{max_id}"
+
+
+class TableSnapshot:
+    # Whole database tables kept as uncompressed Arrow IPC files, so loading
+    # one is memory mapping it. Each file carries the fingerprint of the
+    # table it was written from; a table is only read from the database
+    # again when its fingerprint changes.
+    def __init__(self, engine, directory=DEFAULT_DIRECTORY):
+        self.engine = engine
+        self.directory = Path(directory)
+
+    def path(self, table):
+        return self.directory / f"{table}.arrow"
+
+    def version(self, table):
+        # Fingerprint the local snapshot was written from (None: no snapshot)
+        try:
+            with pa.memory_map(str(self.path(table))) as source:
+                return pa.ipc.open_file(source).schema.metadata[VERSION_KEY].decode()
+        except (FileNotFoundError, KeyError, TypeError, pa.ArrowInvalid):
+            return None
+
+    def sync(self, table):
+        # Refreshes the snapshot if the table changed; returns its version
+        with self.engine.connect() as conn:
+            version = fingerprint(conn, table)
+            if self.version(table) == version:
+                return version
+            papers = pd.read_sql_table(table, conn)
+
+        arrow = pa.Table.from_pandas(papers, preserve_index=False)
+        arrow = arrow.replace_schema_metadata(
+            (arrow.schema.metadata or {}) | {VERSION_KEY: version.encode()}
+        )
+        # Written aside and renamed, so readers (and mappings of the old
+        # file) never see a partial one
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        os.close(fd)
+        try:
+            with pa.OSFile(tmp, "wb") as sink:
+                with pa.ipc.new_file(sink, arrow.schema) as writer:
+                    writer.write_table(arrow)
+            os.replace(tmp, self.path(table))
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        return version
+
+    def open(self, table):
+        # The snapshot as a memory-mapped Arrow table (zero copy)
+        return pa.ipc.open_file(pa.memory_map(str(self.path(table)))).read_all()
@@ -0,0 +1,66 @@
+from itertools import chain
+import numpy as np
+import pandas as pd
+
+
+class SubjectIndex:
+    # Multi-hot subject areas of papers: one packed bitmap per area (a field
+    # label, e.g. a two-digit subject area), with bit i set when paper i (in
+    # the table's row order) is in that area. Field filters and per-area
+    # means are mask operations on the bitmaps, so a paper with several
+    # subject codes is found under every one of its areas.
+    def __init__(self, areas, bitmaps, size, groups=None):
+        self.areas = areas
+        self.bitmaps = bitmaps
+        self.size = size
+        # Optional int code per paper (e.g. of its title): papers sharing one
+        # count once per area in means()
+        self.groups = groups
+
+    @classmethod
+    def build(cls, paper_areas, groups=None):
+        # paper_areas: Series of lists of areas per paper; groups: Series of
+        # duplicate keys per paper (missing keys are equal to each other)
+        if groups is not None:
+            groups = pd.factorize(groups, use_na_sentinel=False)[0].astype(np.int32)
+        lengths = paper_areas.map(len).to_numpy()
+        codes, areas = pd.factorize(
+            pd.Series(list(chain.from_iterable(paper_areas)), dtype=object), sort=True
+        )
+        matrix = np.zeros((len(areas), len(paper_areas)), dtype=bool)
+        matrix[codes, np.repeat(np.arange(len(paper_areas)), lengths)] = True
+        return cls(
+            pd.Index(areas, name="area"),
+            np.packbits(matrix, axis=1),
+            len(paper_areas),
+            groups,
+        )
+
+    def _matrix(self, rows):
+        # Unpacked bitmaps (areas x selected papers)
+        matrix = np.unpackbits(self.bitmaps, axis=1, count=self.size).view(bool)
+        return matrix if rows is None else matrix[:, rows]
+
+    def mask(self, area, rows=None):
+        # Boolean mask of the (selected) papers with a subject in `area`
+        if area not in self.areas:
+            return np.zeros(self.size if rows is None else np.count_nonzero(rows), bool)
+        bitmap = self.bitmaps[self.areas.get_loc(area)]
+        mask = np.unpackbits(bitmap, count=self.size).view(bool)
+        return mask if rows is None else mask[rows]
+
+    def means(self, values, rows=None):
+        # Mean of `values` (aligned with the selected papers) per area, over
+        # the papers in it, only the first selected paper of each group
+        # counting; areas without papers are left out
+        area, paper = np.nonzero(self._matrix(rows))
+        if self.groups is not None:
+            groups = self.groups if rows is None else self.groups[rows]
+            keys = area.astype(np.int64) * (int(groups.max(initial=0)) + 1)
+            _, first = np.unique(keys + groups[paper], return_index=True)
+            area, paper = area[first], paper[first]
+        values = np.asarray(values, dtype=np.float64)
+        counts = np.bincount(area, minlength=len(self.areas))
+        sums = np.bincount(area, weights=values[paper], minlength=len(self.areas))
+        kept = counts > 0
+        return pd.Series(sums[kept] / counts[kept], index=self.areas[kept])
@@ -0,0 +1,122 @@
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+
+def normalize_rows(matrix):
+    # In place: callers pass a float32 buffer they own.
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+
+class VectorStore:
+    # One C-contiguous, L2-normalized float32 matrix per field, all sharing the
+    # row order of `ids` (the combined_minimal index). Papers missing a field
+    # (e.g. no abstract) keep a zero row and are flagged in `present`.
+    def __init__(self, ids, vectors, present):
+        self.ids = ids
+        self.vectors = vectors
+        self.present = present
+
+    @classmethod
+    def from_frames(cls, **frames):
+        return cls.from_arrays(
+            **{
+                field: (frame.index, frame.to_numpy(dtype=np.float32))
+                for field, frame in frames.items()
+            }
+        )
+
+    @classmethod
+    def from_arrays(cls, **fields):
+        # fields: name -> (index, matrix), each possibly covering other papers
+        index = None
+        for field_index, _ in fields.values():
+            index = field_index if index is None else index.union(field_index)
+        index = index.sort_values()
+
+        vectors = {}
+        present = {}
+        for field, (field_index, field_matrix) in fields.items():
+            rows = index.get_indexer(field_index)
+            matrix = np.zeros((len(index), field_matrix.shape[1]), dtype=np.float32)
+            matrix[rows] = field_matrix
+            vectors[field] = normalize_rows(matrix)
+            present[field] = np.zeros(len(index), dtype=bool)
+            present[field][rows] = True
+
+        return cls(index.to_numpy(dtype=np.int64), vectors, present)
+
+    @classmethod
+    def load(cls, directory, mmap_mode=None, prefix="vectors"):
+        # Saved vectors are already normalized, so with mmap_mode="r" loading
+        # is just mapping the files read-only. Every process mapping the same
+        # files shares one copy of them in the OS page cache. Other prefixes
+        # hold variants of the same papers, e.g. "pca128".
+        directory = Path(directory)
+
+        def load_array(name):
+            return np.asarray(np.load(directory / name, mmap_mode=mmap_mode))
+
+        vectors = {}
+        present = {}
+        for path in sorted(directory.glob(f"{prefix}.*.present.npy")):
+            field = path.name.split(".")[1]
+            vectors[field] = load_array(f"{prefix}.{field}.npy")
+            present[field] = load_array(path.name)
+        return cls(load_array(f"{prefix}.ids.npy"), vectors, present)
+
+    def save(self, directory, prefix="vectors"):
+        directory = Path(directory)
+        np.save(directory / f"{prefix}.ids.npy", self.ids)
+        for field in self.fields:
+            np.save(directory / f"{prefix}.{field}.npy", self.vectors[field])
+            np.save(directory / f"{prefix}.{field}.present.npy", self.present[field])
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def index(self):
+        return pd.Index(self.ids, name="index")
+
+    @property
+    def fields(self):
+        return list(self.vectors)
+
+    def rows(self, ids):
+        # Row positions of paper ids (ids are sorted); KeyError for unknown ones
+        ids = np.asarray(ids, dtype=np.int64)
+        rows = np.searchsorted(self.ids, ids).clip(max=len(self.ids) - 1)
+        missing = self.ids[rows] != ids
+        if missing.any():
+            raise KeyError(ids[missing].tolist())
+        return rows
+
+    def score(self, field, query_vector, rows=None):
+        # Cosine similarity of every row (or only `rows`) against one query, as
+        # a single matrix-vector product. Rows without the field score NaN.
+        query = np.asarray(query_vector, dtype=np.float32).ravel()
+        norm = np.linalg.norm(query)
+        if norm > 0:
+            query = query / norm
+
+        if rows is None:
+            scores = self.vectors[field] @ query
+            scores[~self.present[field]] = np.nan
+        else:
+            scores = self.vectors[field][rows] @ query
+            scores[~self.present[field][rows]] = np.nan
+        return scores
+
+    def score_many(self, field, query_vectors, rows=None):
+        # (N, n_queries) cosine similarities from one matrix-matrix product
+        queries = normalize_rows(np.array(query_vectors, dtype=np.float32, ndmin=2))
+        if rows is None:
+            scores = self.vectors[field] @ queries.T
+            scores[~self.present[field]] = np.nan
+        else:
+            scores = self.vectors[field][rows] @ queries.T
+            scores[~self.present[field][rows]] = np.nan
+        return scores